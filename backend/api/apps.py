@@ -1,5 +1,13 @@
 from django.apps import AppConfig
+from django.core.signals import request_started
+from django.db.backends.signals import connection_created
 
 
 class ApiConfig(AppConfig):
     name = 'api'
+
+    def ready(self):
+        from foodgram_backend.connections import check_connections
+        from foodgram_backend.metrics import install_query_wrapper
+        request_started.connect(check_connections)
+        connection_created.connect(install_query_wrapper)
@@ -0,0 +1,88 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.urls import URLPattern
+
+from foodgram_backend.connections import check_connections
+from foodgram_backend.settings import ASYNC_VIEWS_THREADS
+
+# Горячие представления на чтение
+ASYNC_URL_NAMES = (
+    'recipes-list', 'recipes-detail', 'tags-list', 'tags-detail',
+    'Ingredients-list', 'users-subscriptions',
+)
+
+executor = ThreadPoolExecutor(
+    max_workers=ASYNC_VIEWS_THREADS, thread_name_prefix='async-views'
+)
+
+
+def run_view(view, request, args, kwargs):
+    """ Выполнение представления в потоке пула.
+
+        Соединения с БД у потоков пула свои, поэтому проверка и
+        закрытие соединений выполняются здесь, а не в сигналах
+        запроса. Ответ рендерится в этом же потоке.
+    """
+
+    close_old_connections()
+    check_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        if callable(getattr(response, 'render', None)):
+            response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+def run_in_pool(func, *args):
+    """ Синхронный вызов func в потоке пула.
+
+        Django 3.2 под ASGI читает потоковые ответы в потоке цикла
+        событий, где ORM запрещен, поэтому запросы к БД из
+        генераторов ответа выполняются здесь.
+    """
+
+    def run():
+        close_old_connections()
+        try:
+            return func(*args)
+        finally:
+            close_old_connections()
+
+    return executor.submit(run).result()
+
+
+def async_view(view):
+    """ Асинхронная обертка синхронного представления DRF.
+
+        DRF 3.12 и ORM Django 3.2 синхронные, поэтому представление
+        целиком выполняется через sync_to_async в пуле из
+        ASYNC_VIEWS_THREADS потоков, а не в единственном потоке
+        синхронных представлений ASGI. Цикл событий в это время
+        обслуживает другие соединения.
+    """
+
+    run = sync_to_async(run_view, thread_sensitive=False, executor=executor)
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        return await run(view, request, args, kwargs)
+
+    wrapper.sync_view = view
+    return wrapper
+
+
+def async_urls(patterns):
+    """ Замена представлений ASYNC_URL_NAMES асинхронными обертками. """
+
+    return [
+        URLPattern(
+            pattern.pattern, async_view(pattern.callback),
+            pattern.default_args, pattern.name,
+        ) if pattern.name in ASYNC_URL_NAMES else pattern
+        for pattern in patterns
+    ]
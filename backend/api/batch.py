@@ -0,0 +1,56 @@
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from django.core.handlers.wsgi import WSGIRequest
+from django.urls import Resolver404, resolve
+from rest_framework import status
+
+
+def make_subrequest(request, path, query):
+    """ GET запрос к path с окружением и пользователем запроса request.
+
+        Пользователь и токен передаются через принудительную
+        аутентификацию DRF, поэтому подзапросы не проверяют токен
+        повторно. Анонимные подзапросы получают те же ответы 401, что
+        и прямые запросы.
+    """
+
+    environ = dict(
+        request._request.META,
+        PATH_INFO=path,
+        QUERY_STRING=query,
+        REQUEST_METHOD='GET',
+        CONTENT_LENGTH='0',
+    )
+    environ.pop('CONTENT_TYPE', None)
+    # Под ASGI в META нет ключей wsgi.*
+    environ['wsgi.input'] = BytesIO()
+    environ['wsgi.url_scheme'] = request.scheme
+    subrequest = WSGIRequest(environ)
+    if request.user.is_authenticated:
+        subrequest._force_auth_user = request.user
+        subrequest._force_auth_token = request.auth
+    return subrequest
+
+
+def dispatch_get(request, url):
+    """ Выполнение GET подзапроса через url-ы api в текущем потоке.
+
+        Возвращает (статус, данные ответа). Подзапросы вне api и к
+        самому batch не выполняются.
+    """
+
+    path, query = urlsplit(url)[2:4]
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return status.HTTP_404_NOT_FOUND, {'errors': 'Адрес не найден.'}
+    if match.namespace != 'api' or match.url_name == 'batch-list':
+        return status.HTTP_400_BAD_REQUEST, {
+            'errors': 'Недопустимый адрес подзапроса.'
+        }
+    view = getattr(match.func, 'sync_view', match.func)
+    response = view(
+        make_subrequest(request, path, query), *match.args, **match.kwargs
+    )
+    return response.status_code, getattr(response, 'data', None)
@@ -0,0 +1,183 @@
+import asyncio
+import io
+import logging
+import mimetypes
+from base64 import b64encode
+from itertools import groupby, islice
+
+from django.db import DatabaseError, transaction
+from rest_framework.exceptions import ParseError
+
+from foodgram_backend.settings import (
+    RECIPES_EXPORT_CHUNK_SIZE, RECIPES_IMPORT_BATCH_SIZE,
+    RECIPES_IMPORT_MAX_ERRORS, RECIPES_IMPORT_MAX_LINES,
+)
+from recipes.models import Recipe, RecipeIngredient, RecipeTags
+from .async_views import run_in_pool
+from .parsers import ORJSONParser
+from .renderers import ORJSONRenderer
+from .serializers import RecipeCreateUpdateSerializer
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FIELDS = (
+    'id', 'name', 'text', 'cooking_time', 'pub_date', 'image',
+    'author_id', 'author__username',
+)
+
+
+def export_chunk(after_id):
+    """ Рецепты с id больше after_id, не больше размера чанка.
+
+        Чанки выбираются по ключу id, без OFFSET. Ингредиенты и теги
+        чанка читаются серверным курсором.
+    """
+
+    recipes = list(
+        Recipe.objects.filter(pk__gt=after_id).order_by('pk').values(
+            *EXPORT_FIELDS
+        )[:RECIPES_EXPORT_CHUNK_SIZE]
+    )
+    if not recipes:
+        return recipes
+    first_id, last_id = recipes[0]['id'], recipes[-1]['id']
+    ingredients = {
+        recipe_id: [
+            {
+                'id': ingredient_id, 'name': name,
+                'measurement_unit': measurement_unit, 'amount': amount,
+            }
+            for _, ingredient_id, name, measurement_unit, amount in rows
+        ]
+        for recipe_id, rows in groupby(
+            RecipeIngredient.objects.filter(
+                recipe__gte=first_id, recipe__lte=last_id
+            ).order_by('recipe', 'id').values_list(
+                'recipe', 'ingredient', 'ingredient__name',
+                'ingredient__measurement_unit', 'amount',
+            ).iterator(chunk_size=RECIPES_EXPORT_CHUNK_SIZE),
+            key=lambda row: row[0],
+        )
+    }
+    tags = {
+        recipe_id: [tag_id for _, tag_id in rows]
+        for recipe_id, rows in groupby(
+            RecipeTags.objects.filter(
+                recipe__gte=first_id, recipe__lte=last_id
+            ).order_by('recipe', 'tag').values_list(
+                'recipe', 'tag'
+            ).iterator(chunk_size=RECIPES_EXPORT_CHUNK_SIZE),
+            key=lambda row: row[0],
+        )
+    }
+    for recipe in recipes:
+        recipe['author'] = {
+            'id': recipe.pop('author_id'),
+            'username': recipe.pop('author__username'),
+        }
+        recipe['tags'] = tags.get(recipe['id'], [])
+        recipe['ingredients'] = ingredients.get(recipe['id'], [])
+    return recipes
+
+
+def image_data_uri(storage, name):
+    """ Картинка в формате data URI, как ее принимает API.
+
+        Если файл не читается, возвращается None: выгрузка уже идет
+        ответом 200 и не должна обрываться на одном рецепте.
+    """
+
+    mime = mimetypes.guess_type(name)[0] or 'image/png'
+    try:
+        with storage.open(name, 'rb') as image:
+            content = image.read()
+    except OSError:
+        logger.warning('Картинка %s не выгружена', name, exc_info=True)
+        return None
+    return f'data:{mime};base64,{b64encode(content).decode()}'
+
+
+def export_recipes(request, inline_images=False):
+    """ Генератор NDJSON всех рецептов по возрастанию id.
+
+        В памяти держится один чанк. Картинка - абсолютный url или,
+        с inline_images, data URI для повторного импорта (null, если
+        файл не прочитан).
+    """
+
+    renderer = ORJSONRenderer()
+    storage = Recipe._meta.get_field('image').storage
+    try:
+        asyncio.get_running_loop()
+        fetch = run_in_pool
+    except RuntimeError:
+        def fetch(func, *args):
+            return func(*args)
+    after_id = 0
+    while True:
+        recipes = fetch(export_chunk, after_id)
+        if not recipes:
+            return
+        for recipe in recipes:
+            if recipe['image']:
+                recipe['image'] = image_data_uri(
+                    storage, recipe['image']
+                ) if inline_images else request.build_absolute_uri(
+                    storage.url(recipe['image'])
+                )
+            yield renderer.render(recipe) + b'\n'
+        after_id = recipes[-1]['id']
+
+
+def import_line(request, line):
+    """ Создание рецепта из строки NDJSON, возвращает ошибки. """
+
+    try:
+        data = ORJSONParser().parse(io.BytesIO(line))
+    except ParseError:
+        return 'Строка не является JSON.'
+    if not isinstance(data, dict):
+        return 'Строка должна быть объектом JSON.'
+    serializer = RecipeCreateUpdateSerializer(
+        data=data, context={'request': request}
+    )
+    if not serializer.is_valid():
+        return serializer.errors
+    try:
+        serializer.save()
+    except DatabaseError as error:
+        return str(error)
+    return None
+
+
+def import_recipes(request, stream):
+    """ Импорт рецептов из NDJSON в формате экспорта.
+
+        Строки проверяются сериализатором создания рецепта, автор -
+        пользователь запроса, id, author и pub_date игнорируются,
+        картинка - data URI. Рецепты сохраняются пачками по
+        RECIPES_IMPORT_BATCH_SIZE в одной транзакции, ошибка строки
+        откатывает только ее. Читается не больше
+        RECIPES_IMPORT_MAX_LINES строк. Возвращает (создано, ошибки
+        строк, есть ли непрочитанные строки).
+    """
+
+    numbered = enumerate(stream, 1)
+    lines = (
+        (number, line)
+        for number, line in islice(numbered, RECIPES_IMPORT_MAX_LINES)
+        if line.strip()
+    )
+    created, errors = 0, []
+    while True:
+        batch = list(islice(lines, RECIPES_IMPORT_BATCH_SIZE))
+        if not batch:
+            break
+        with transaction.atomic():
+            for number, line in batch:
+                line_errors = import_line(request, line)
+                if line_errors is None:
+                    created += 1
+                elif len(errors) < RECIPES_IMPORT_MAX_ERRORS:
+                    errors.append({'line': number, 'errors': line_errors})
+    return created, errors, next(numbered, None) is not None
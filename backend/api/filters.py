@@ -1,24 +1,33 @@
+from django.db.models import Exists, OuterRef, Q
 from django_filters.rest_framework import FilterSet, filters
 
-from recipes.models import Ingredient, Recipe
+from recipes.models import (
+    Favorite, Ingredient, Recipe, RecipeIngredient, ShoppingCart,
+)
 from users.models import User
 from .mixins import CheckIntOrStrMixin
 
 
 class UserFilter(FilterSet):
-    limit = filters.CharFilter(
-        method='get_users_limit'
-    )
+    """ Фильтр пользователей.
+
+        limit обрабатывает пагинация. search - поиск по началу
+        username, имени или фамилии без учета регистра, на PostgreSQL
+        по индексам UPPER(...) text_pattern_ops.
+    """
+
+    search = filters.CharFilter(method='filter_search')
 
     class Meta:
         model = User
-        fields = '__all__'
+        fields = ('username', 'email')
 
-    def get_users_limit(self, queryset, name, value):
-        query_params = self.request.query_params
-        if 'limit' in query_params:
-            limit = int(query_params.get('limit'))
-            return User.objects.all()[:limit]
+    def filter_search(self, queryset, name, value):
+        return queryset.filter(
+            Q(username__istartswith=value)
+            | Q(first_name__istartswith=value)
+            | Q(last_name__istartswith=value)
+        )
 
 
 class IngredientFilter(FilterSet):
@@ -35,7 +44,11 @@ class IngredientFilter(FilterSet):
 
 
 class RecipeFilter(FilterSet, CheckIntOrStrMixin):
-    """Фильтрация по избранному, автору, списку покупок и тегам."""
+    """Фильтрация по избранному, автору, списку покупок, тегам
+    и ингредиентам.
+
+    Сортировка по популярности: ordering=popular.
+    """
 
     author = filters.CharFilter(
         method='get_author',
@@ -44,12 +57,21 @@ class RecipeFilter(FilterSet, CheckIntOrStrMixin):
     tags = filters.CharFilter(
         method='get_tags',
     )
+    ingredients = filters.CharFilter(
+        method='get_ingredients',
+    )
+    exclude_ingredients = filters.CharFilter(
+        method='get_exclude_ingredients',
+    )
     is_favorited = filters.BooleanFilter(
         method='get_is_favorite',
     )
     is_in_shopping_cart = filters.BooleanFilter(
         method='get_is_in_shopping_cart',
     )
+    ordering = filters.CharFilter(
+        method='get_ordering',
+    )
 
     class Meta:
         model = Recipe
@@ -63,7 +85,7 @@ class RecipeFilter(FilterSet, CheckIntOrStrMixin):
             self.validate_pk(value)
             and User.objects.filter(id=value).exists()
         ):
-            return Recipe.objects.filter(author=value)
+            return queryset.filter(author=value)
         return queryset.none()
 
     def get_tags(self, queryset, name, value):
@@ -72,24 +94,66 @@ class RecipeFilter(FilterSet, CheckIntOrStrMixin):
             return queryset.filter(tags__slug__in=tags).distinct()
         return queryset
 
-    def get_is_favorite(self, queryset, name, value):
-        user = self.request.user
-        if (
-            (user.is_authenticated and value)
-            or not value
-        ):
-            return Recipe.objects.filter(
-                favorite__user=user.pk
+    def get_ingredient_ids(self, name):
+        """ Id ингредиентов через запятую или повтором параметра. """
+
+        return [
+            value for param in self.request.query_params.getlist(name)
+            for value in param.split(',') if value
+        ]
+
+    def get_ingredients(self, queryset, name, value):
+        """ Рецепты со всеми ингредиентами: EXISTS на каждый id. """
+
+        ingredients = self.get_ingredient_ids(name)
+        if not all(map(self.validate_pk, ingredients)):
+            return queryset.none()
+        for ingredient in set(ingredients):
+            queryset = queryset.filter(Exists(
+                RecipeIngredient.objects.filter(
+                    ingredient=ingredient, recipe=OuterRef('pk')
+                )
+            ))
+        return queryset
+
+    def get_exclude_ingredients(self, queryset, name, value):
+        """ Рецепты без ингредиентов: один NOT EXISTS на все id. """
+
+        ingredients = self.get_ingredient_ids(name)
+        if not all(map(self.validate_pk, ingredients)):
+            return queryset.none()
+        if not ingredients:
+            return queryset
+        return queryset.filter(~Exists(
+            RecipeIngredient.objects.filter(
+                ingredient__in=ingredients, recipe=OuterRef('pk')
             )
-        return queryset.none()
+        ))
+
+    def filter_user_list(self, queryset, model, value):
+        """ Рецепты из списка пользователя model или не из него. """
 
-    def get_is_in_shopping_cart(self, queryset, name, value):
         user = self.request.user
-        if (
-            (user.is_authenticated and value)
-            or not value
-        ):
-            return Recipe.objects.filter(
-                shopping_list__user=user.pk
-            )
-        return queryset.none()
+        if not user.is_authenticated:
+            return queryset.none() if value else queryset
+        in_list = Exists(
+            model.objects.filter(user=user, recipe=OuterRef('pk'))
+        )
+        return queryset.filter(in_list if value else ~in_list)
+
+    def get_is_favorite(self, queryset, name, value):
+        return self.filter_user_list(queryset, Favorite, value)
+
+    def get_is_in_shopping_cart(self, queryset, name, value):
+        return self.filter_user_list(queryset, ShoppingCart, value)
+
+    def get_ordering(self, queryset, name, value):
+        """ ordering=popular - по рейтингу за неделю.
+
+            Рейтинг переносится из почасовой статистики в
+            Recipe.popularity командой refresh_popularity.
+        """
+
+        if value == 'popular':
+            return queryset.order_by('-popularity', '-pub_date')
+        return queryset
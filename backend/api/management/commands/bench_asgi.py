@@ -0,0 +1,117 @@
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Замер ASGI приложения при большом числе одновременных соединений!'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', nargs='+', default=(
+                '/api/recipes/?limit=6', '/api/tags/',
+                '/api/ingredients/?name=мо',
+            ),
+            help='Адреса запросов, выполняются по кругу',
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=1000,
+            help='Одновременных соединений',
+        )
+        parser.add_argument(
+            '--requests', type=int, default=5000,
+            help='Всего запросов',
+        )
+        parser.add_argument(
+            '--token', default='',
+            help='Токен для заголовка Authorization',
+        )
+
+    def get_headers(self, token):
+        host = next(
+            (host for host in settings.ALLOWED_HOSTS if host != '*'),
+            'localhost',
+        )
+        headers = [(b'host', host.lstrip('.').encode())]
+        if token:
+            headers.append((b'authorization', f'Token {token}'.encode()))
+        return headers
+
+    async def request(self, application, url, headers):
+        """ Один запрос к приложению, возвращает статус ответа. """
+
+        path, query = urlsplit(url)[2:4]
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': query.encode(),
+            'headers': headers,
+            'client': ('127.0.0.1', 0),
+            'server': ('127.0.0.1', 80),
+        }
+        response = {}
+        disconnect = asyncio.Event()
+
+        async def receive():
+            if 'body' in response:
+                await disconnect.wait()
+                return {'type': 'http.disconnect'}
+            response['body'] = b''
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                response['status'] = message['status']
+
+        await application(scope, receive, send)
+        disconnect.set()
+        return response['status']
+
+    async def run(self, options):
+        application = get_asgi_application()
+        headers = self.get_headers(options['token'])
+        paths = options['path']
+        urls = iter(range(options['requests']))
+        latencies, errors = [], 0
+
+        async def connection():
+            nonlocal errors
+            for number in urls:
+                started = time.monotonic()
+                status = await self.request(
+                    application, paths[number % len(paths)], headers
+                )
+                latencies.append(time.monotonic() - started)
+                errors += status >= 400
+
+        started = time.monotonic()
+        await asyncio.gather(
+            *(connection() for _ in range(options['concurrency']))
+        )
+        return time.monotonic() - started, sorted(latencies), errors
+
+    def handle(self, *args, **options):
+        seconds, latencies, errors = asyncio.run(self.run(options))
+
+        def percentile(value):
+            return latencies[int(len(latencies) * value / 100) - 1] * 1000
+
+        print(
+            f'ASYNC_VIEWS={settings.ASYNC_VIEWS}, '
+            f'соединений {options["concurrency"]}, '
+            f'запросов {len(latencies)}, ошибок {errors}'
+        )
+        print(
+            f'{len(latencies) / seconds:.1f} запросов/с, '
+            f'p50 {percentile(50):.1f} мс, p95 {percentile(95):.1f} мс, '
+            f'p99 {percentile(99):.1f} мс'
+        )
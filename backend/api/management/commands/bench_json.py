@@ -0,0 +1,58 @@
+import timeit
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from api.renderers import ORJSONRenderer
+from api.serializers import IngredientSerializer, RecipeSerializer
+from recipes.models import Ingredient, Recipe
+
+
+class Command(BaseCommand):
+    help = 'Сравнение JSONRenderer и ORJSONRenderer на больших ответах!'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--number', type=int, default=20,
+            help='Количество повторов рендера',
+        )
+        parser.add_argument(
+            '--recipes', type=int, default=100,
+            help='Количество рецептов в странице',
+        )
+
+    def get_payloads(self, recipes_amount):
+        request = APIRequestFactory().get('/api/recipes/')
+        request.user = AnonymousUser()
+        ingredients = IngredientSerializer(
+            Ingredient.objects.all(), many=True
+        ).data
+        recipes = RecipeSerializer(
+            Recipe.objects.all()[:recipes_amount],
+            many=True,
+            context={'request': request},
+        ).data
+        return {
+            'ingredients': ingredients,
+            'recipes': {'count': len(recipes), 'results': recipes},
+        }
+
+    def handle(self, *args, **options):
+        number = options['number']
+        renderers = (JSONRenderer(), ORJSONRenderer())
+        payloads = self.get_payloads(options['recipes'])
+        for name, data in payloads.items():
+            rendered = [renderer.render(data) for renderer in renderers]
+            if rendered[0] != rendered[1]:
+                self.stderr.write(f'{name}: ответы рендеров различаются!')
+            print(f'{name}: {len(rendered[0])} байт')
+            for renderer in renderers:
+                seconds = timeit.timeit(
+                    lambda: renderer.render(data), number=number
+                )
+                print(
+                    f'  {renderer.__class__.__name__}: '
+                    f'{seconds / number * 1000:.3f} мс'
+                )
@@ -0,0 +1,65 @@
+import timeit
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.filters import RecipeFilter
+from recipes.models import Ingredient, Recipe
+
+
+class Command(BaseCommand):
+    help = 'Замер фильтрации рецептов по ингредиентам!'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--number', type=int, default=10,
+            help='Количество повторов запроса',
+        )
+        parser.add_argument(
+            '--ingredients', type=int, nargs='+', default=(1, 5, 20),
+            help='Количество ингредиентов в фильтре',
+        )
+        parser.add_argument(
+            '--limit', type=int, default=6,
+            help='Количество рецептов в странице',
+        )
+
+    def get_queryset(self, params):
+        request = Request(APIRequestFactory().get('/api/recipes/', params))
+        request.user = AnonymousUser()
+        return RecipeFilter(
+            request.query_params, queryset=Recipe.objects.all(),
+            request=request,
+        ).qs
+
+    def handle(self, *args, **options):
+        number = options['number']
+        limit = options['limit']
+        popular = list(Ingredient.objects.annotate(
+            recipes_count=Count('recipe_ingredients')
+        ).order_by('-recipes_count').values_list('id', flat=True)[
+            :max(options['ingredients'])
+        ])
+        print(f'Рецептов: {Recipe.objects.count()}')
+        for amount in options['ingredients']:
+            ids = ','.join(map(str, popular[:amount]))
+            for name in ('ingredients', 'exclude_ingredients'):
+                queryset = self.get_queryset({name: ids})
+                found = queryset.count()
+                count_seconds = timeit.timeit(
+                    lambda: queryset.count(), number=number
+                )
+                page_seconds = timeit.timeit(
+                    lambda: list(
+                        queryset.values_list('pk', flat=True)[:limit]
+                    ),
+                    number=number,
+                )
+                print(
+                    f'{name}={amount} ингр.: найдено {found}, '
+                    f'count {count_seconds / number * 1000:.3f} мс, '
+                    f'страница {page_seconds / number * 1000:.3f} мс'
+                )
@@ -0,0 +1,83 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+from django.db.backends.signals import connection_created
+from django.test import Client
+
+
+class Command(BaseCommand):
+    help = 'Замер запросов в секунду с постоянными соединениями и без!'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', default='/api/recipes/?limit=6',
+            help='Адрес запроса',
+        )
+        parser.add_argument(
+            '--seconds', type=float, default=5,
+            help='Длительность замера для каждого режима',
+        )
+
+    def run(self, client, path, seconds):
+        """ Запросов в секунду и число открытых соединений с БД.
+
+            Тестовый клиент отключает close_old_connections от сигналов
+            начала и конца запроса, поэтому соединения закрываются
+            здесь, как это делает обработчик запросов сервера.
+        """
+
+        connects = []
+
+        def count_connect(**kwargs):
+            connects.append(kwargs['connection'].alias)
+
+        connection_created.connect(count_connect)
+        requests = 0
+        finish = time.monotonic() + seconds
+        try:
+            while time.monotonic() < finish:
+                response = client.get(path)
+                close_old_connections()
+                if response.status_code >= 400:
+                    raise SystemExit(
+                        f'{path}: статус {response.status_code}'
+                    )
+                requests += 1
+        finally:
+            connection_created.disconnect(count_connect)
+        return requests / seconds, len(connects)
+
+    def handle(self, *args, **options):
+        host = next(
+            (host for host in settings.ALLOWED_HOSTS if host != '*'),
+            'localhost',
+        )
+        client = Client(SERVER_NAME=host.lstrip('.'))
+        conn_max_age = {
+            alias: connections[alias].settings_dict['CONN_MAX_AGE']
+            for alias in connections
+        }
+        modes = (
+            (
+                'новое соединение на запрос',
+                {alias: 0 for alias in connections},
+            ),
+            ('CONN_MAX_AGE из настроек', conn_max_age),
+        )
+        try:
+            for name, ages in modes:
+                for alias, age in ages.items():
+                    connections[alias].close()
+                    connections[alias].settings_dict['CONN_MAX_AGE'] = age
+                rps, connects = self.run(
+                    client, options['path'], options['seconds']
+                )
+                print(
+                    f'{name}: {rps:.1f} запросов/с, '
+                    f'соединений с БД: {connects}'
+                )
+        finally:
+            for alias, age in conn_max_age.items():
+                connections[alias].settings_dict['CONN_MAX_AGE'] = age
@@ -0,0 +1,64 @@
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+IMPORT_CODE = 'import django; django.setup(); import {module}'
+
+
+class Command(BaseCommand):
+    help = 'Отчет о времени импорта модулей при запуске процесса!'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--module', default=settings.ROOT_URLCONF,
+            help='Модуль, импортируемый после django.setup()',
+        )
+        parser.add_argument(
+            '--top', type=int, default=20,
+            help='Количество самых медленных модулей в отчете',
+        )
+        parser.add_argument(
+            '--max-ms', type=float, default=None,
+            help='Ошибка, если общее время импорта больше',
+        )
+
+    def get_timings(self, module):
+        """ Список (собственное, общее время в мкс, модуль) -X importtime. """
+
+        result = subprocess.run(
+            (
+                sys.executable, '-X', 'importtime', '-c',
+                IMPORT_CODE.format(module=module),
+            ),
+            capture_output=True, text=True,
+        )
+        if result.returncode:
+            raise CommandError(result.stderr.strip().splitlines()[-1])
+        timings = []
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+            own, total, name = line[len('import time:'):].split('|')
+            timings.append((int(own), int(total), name[1:]))
+        return timings
+
+    def handle(self, *args, **options):
+        timings = self.get_timings(options['module'])
+        total = sum(
+            cumulative for _, cumulative, name in timings
+            if not name.startswith(' ')
+        ) / 1000
+        print(f'Импорт {options["module"]}: {total:.1f} мс, '
+              f'модулей {len(timings)}')
+        print('собств., мс | общее, мс | модуль')
+        for own, cumulative, name in sorted(timings, reverse=True)[
+            :options['top']
+        ]:
+            print(f'{own / 1000:11.1f} | {cumulative / 1000:9.1f} | '
+                  f'{name.strip()}')
+        if options['max_ms'] is not None and total > options['max_ms']:
+            raise CommandError(
+                f'Время импорта {total:.1f} мс больше {options["max_ms"]} мс'
+            )
@@ -7,3 +7,14 @@ class CheckIntOrStrMixin:
             return True
         except ValueError:
             return False
+
+
+class SparseFieldsMixin:
+    """ Вывод только перечисленных в fields полей сериализатора. """
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
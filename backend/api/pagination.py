@@ -1,5 +1,217 @@
-from rest_framework.pagination import PageNumberPagination
+import hashlib
+from base64 import b64decode, b64encode
+from datetime import datetime
+
+from django.core.cache import cache
+from django.core.paginator import (
+    EmptyPage, Page, PageNotAnInteger, Paginator,
+)
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from foodgram_backend.metrics import record_cache
+from foodgram_backend.settings import (
+    PAGINATION_COUNT_CACHE_SECONDS, PAGINATION_ESTIMATED_COUNTS,
+    PAGINATION_ESTIMATE_THRESHOLD, RECIPE_PK_MAX,
+)
+
+COUNT_CACHE_PREFIX = 'page-count:'
+
+
+class EstimatedPage(Page):
+    """ Страница с признаком следующей страницы без точного count. """
+
+    def __init__(self, object_list, number, paginator, next_exists):
+        super().__init__(object_list, number, paginator)
+        self.next_exists = next_exists
+
+    def has_next(self):
+        return self.next_exists
+
+
+class EstimatedCountPaginator(Paginator):
+    """ Пагинатор с приблизительным количеством объектов.
+
+        Без фильтров count - оценка строк таблицы из pg_class.reltuples,
+        с фильтрами - точный count из кеша на
+        PAGINATION_COUNT_CACHE_SECONDS по тексту запроса. Без фильтров
+        небольшие таблицы и таблицы не в PostgreSQL считаются точно. Для
+        приблизительного count номер страницы не ограничивается
+        числом страниц, а наличие следующей проверяется лишним
+        объектом в выборке.
+    """
+
+    def estimate_count(self, queryset):
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class '
+                'WHERE oid = %s::regclass',
+                (queryset.model._meta.db_table,),
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    def cached_count(self, queryset):
+        """ Точный count из кеша и признак, что он взят из кеша. """
+
+        try:
+            sql, params = queryset.query.get_compiler(
+                queryset.db
+            ).as_sql()
+        except EmptyResultSet:
+            return 0, False
+        key = COUNT_CACHE_PREFIX + hashlib.sha256(
+            f'{queryset.db}|{sql}|{params!r}'.encode()
+        ).hexdigest()
+        count = cache.get(key)
+        record_cache('pagination_count', count is not None)
+        if count is not None:
+            return count, True
+        count = queryset.count()
+        cache.set(key, count, PAGINATION_COUNT_CACHE_SECONDS)
+        return count, False
+
+    @cached_property
+    def counted(self):
+        """ Количество объектов и признак приблизительности. """
+
+        queryset = self.object_list
+        if not hasattr(queryset, 'query') or queryset.query.is_sliced:
+            return super().count, False
+        if queryset.query.where or queryset.query.distinct:
+            return self.cached_count(queryset)
+        estimate = self.estimate_count(queryset)
+        if estimate is None or estimate < PAGINATION_ESTIMATE_THRESHOLD:
+            return queryset.count(), False
+        return estimate, True
+
+    @property
+    def count(self):
+        return self.counted[0]
+
+    @property
+    def approximate(self):
+        return self.counted[1]
+
+    def validate_number(self, number):
+        if not self.approximate:
+            return super().validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('Номер страницы не целое число')
+        if number < 1:
+            raise EmptyPage('Номер страницы меньше 1')
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if not self.approximate:
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        object_list = list(
+            self.object_list[bottom:bottom + self.per_page + 1]
+        )
+        if not object_list and number > 1:
+            raise EmptyPage('На этой странице нет результатов')
+        return EstimatedPage(
+            object_list[:self.per_page], number, self,
+            len(object_list) > self.per_page,
+        )
 
 
 class LimitPagination(PageNumberPagination):
+    """ Пагинация по номеру страницы и limit.
+
+        С PAGINATION_ESTIMATED_COUNTS count может быть приблизительным,
+        тогда в ответе count_approximate равен true.
+    """
+
+    page_size_query_param = 'limit'
+    if PAGINATION_ESTIMATED_COUNTS:
+        django_paginator_class = EstimatedCountPaginator
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data['count_approximate'] = getattr(
+            self.page.paginator, 'approximate', False
+        )
+        return response
+
+
+class PubDateCursorPagination(BasePagination):
+    """ Курсорная пагинация по (pub_date, id) в обратном порядке.
+
+        Вместо queryset принимает функцию get_page(limit, cursor),
+        возвращающую до limit + 1 пар (pub_date, id). Курсор -
+        непрозрачная строка с последней парой страницы.
+    """
+
+    cursor_query_param = 'cursor'
     page_size_query_param = 'limit'
+    max_page_size = 100
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return api_settings.PAGE_SIZE
+        return max(1, min(page_size, self.max_page_size))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            pub_date, pk = b64decode(
+                encoded.encode(), altchars=b'-_', validate=True
+            ).decode().split('|')
+            pub_date, pk = datetime.fromisoformat(pub_date), int(pk)
+            # Курсоры выдаются с часовым поясом, id рецепта - BigAutoField
+            if pub_date.tzinfo is None:
+                raise ValueError('Дата курсора без часового пояса')
+            if not 0 < pk <= RECIPE_PK_MAX:
+                raise ValueError('Id курсора вне диапазона')
+        except (UnicodeError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        return pub_date, pk
+
+    def encode_cursor(self, item):
+        pub_date, pk = item
+        return b64encode(
+            f'{pub_date.isoformat()}|{pk}'.encode(), altchars=b'-_'
+        ).decode()
+
+    def paginate_queryset(self, get_page, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        page = get_page(page_size, self.decode_cursor(request))
+        self.next_cursor = None
+        if len(page) > page_size:
+            self.next_cursor = self.encode_cursor(page[page_size - 1])
+        return [pk for _, pk in page[:page_size]]
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.next_cursor,
+        )
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
@@ -0,0 +1,136 @@
+from functools import lru_cache
+
+from django.core.files.storage import FileSystemStorage
+from django.db import connections, router
+
+from foodgram_backend.settings import RECIPES_DB_JSON
+from recipes.models import (
+    Favorite, Ingredient, Recipe, RecipeIngredient,
+    RecipeTags, ShoppingCart, Tag,
+)
+from users.models import Subscription, User
+
+RECIPE_FIELDS_SQL = {
+    'id': 'r.id',
+    'author': f'''json_build_object(
+        'id', u.id,
+        'username', u.username,
+        'first_name', u.first_name,
+        'last_name', u.last_name,
+        'email', u.email,
+        'is_subscribed', EXISTS (
+            SELECT 1 FROM {Subscription._meta.db_table} s
+            WHERE s.author_id = u.id AND s.user_id = %(user)s
+        )
+    )''',
+    'tags': f'''COALESCE((
+        SELECT json_agg(json_build_object(
+            'id', t.id,
+            'name', t.name,
+            'color', t.color,
+            'slug', t.slug
+        ) ORDER BY t.id)
+        FROM {RecipeTags._meta.db_table} rt
+        JOIN {Tag._meta.db_table} t ON t.id = rt.tag_id
+        WHERE rt.recipe_id = r.id
+    ), '[]')''',
+    'ingredients': f'''COALESCE((
+        SELECT json_agg(json_build_object(
+            'id', i.id,
+            'name', i.name,
+            'measurement_unit', i.measurement_unit,
+            'amount', ri.amount
+        ) ORDER BY ri.id)
+        FROM {RecipeIngredient._meta.db_table} ri
+        JOIN {Ingredient._meta.db_table} i ON i.id = ri.ingredient_id
+        WHERE ri.recipe_id = r.id
+    ), '[]')''',
+    'is_favorited': f'''EXISTS (
+        SELECT 1 FROM {Favorite._meta.db_table} f
+        WHERE f.recipe_id = r.id AND f.user_id = %(user)s
+    )''',
+    'is_in_shopping_cart': f'''EXISTS (
+        SELECT 1 FROM {ShoppingCart._meta.db_table} c
+        WHERE c.recipe_id = r.id AND c.user_id = %(user)s
+    )''',
+    'name': 'r.name',
+    'text': 'r.text',
+    'cooking_time': 'r.cooking_time',
+    # Url картинок - префикс медиа (%(media)s) и имя файла, как в
+    # FileSystemStorage.url для имен без символов, требующих
+    # кодирования
+    'image': "CASE WHEN r.image = '' THEN NULL ELSE %(media)s || r.image END",
+    'image_renditions': '''COALESCE((
+        SELECT json_object_agg(s.key, COALESCE((
+            SELECT json_object_agg(k.key, %(media)s || k.value)
+            FROM jsonb_each_text(s.value) k
+        ), '{}'))
+        FROM jsonb_each(r.image_renditions -> 'sizes') s
+    ), '{}')''',
+    'image_placeholder': 'r.image_placeholder',
+}
+
+RECIPES_JSON_SQL = f'''
+SELECT COALESCE(
+    json_agg(
+        page.recipe ORDER BY array_position(%(ids)s::bigint[], page.id)
+    ),
+    '[]'
+)::text
+FROM (
+    SELECT r.id, json_build_object({{fields}}) AS recipe
+    FROM {Recipe._meta.db_table} r
+    JOIN {User._meta.db_table} u ON u.id = r.author_id
+    WHERE r.id = ANY(%(ids)s::bigint[])
+) page
+'''
+
+
+@lru_cache()
+def recipes_json_sql(fields):
+    """ SQL запрос JSON рецептов с полями fields в порядке их указания. """
+
+    return RECIPES_JSON_SQL.format(fields=', '.join(
+        f"'{name}', {RECIPE_FIELDS_SQL[name]}" for name in fields
+    ))
+
+
+def recipes_json_enabled():
+    """ Сборка JSON рецептов в БД возможна только на PostgreSQL.
+
+        Url картинок собираются в SQL по MEDIA_URL, поэтому хранилище
+        картинок должно быть файловым.
+    """
+
+    if not RECIPES_DB_JSON:
+        return False
+    if not isinstance(
+        Recipe._meta.get_field('image').storage, FileSystemStorage
+    ):
+        return False
+    using = router.db_for_read(Recipe)
+    return connections[using].vendor == 'postgresql'
+
+
+def recipes_json(ids, request, fields=tuple(RECIPE_FIELDS_SQL)):
+    """ JSON списка рецептов в формате RecipeSerializer одним запросом.
+
+        JSON страницы вместе с абсолютными url картинок собирается в
+        PostgreSQL через json_build_object и json_agg в порядке
+        переданных id, сериализаторы DRF не создаются. Возвращает
+        байты JSON для RawJSON.
+    """
+
+    ids = list(ids)
+    if not ids:
+        return b'[]'
+    using = router.db_for_read(Recipe)
+    media = request.build_absolute_uri(
+        Recipe._meta.get_field('image').storage.base_url
+    )
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            recipes_json_sql(tuple(fields)),
+            {'ids': ids, 'user': request.user.id, 'media': media},
+        )
+        return cursor.fetchone()[0].encode()
@@ -0,0 +1,93 @@
+import json
+from uuid import uuid4
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class RawJSON:
+    """ Готовый JSON, например собранный в БД, для данных ответа.
+
+        ORJSONRenderer вставляет его в ответ без разбора.
+    """
+
+    __slots__ = ('content',)
+
+    def __init__(self, content):
+        self.content = content
+
+
+class RawJSONEncoder(JSONEncoder):
+    """ JSONEncoder DRF, разбирающий RawJSON для JSONRenderer. """
+
+    def default(self, obj):
+        if isinstance(obj, RawJSON):
+            return json.loads(obj.content)
+        return super().default(obj)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """ Быстрый рендер JSON на orjson.
+
+        Ответ побайтно совпадает с JSONRenderer: кириллица не
+        экранируется, даты, Decimal, UUID и ленивые строки
+        преобразуются JSONEncoder'ом DRF. Если orjson не установлен,
+        запрошен отступ или orjson не может сериализовать данные
+        (например, int больше 64 бит), используется JSONRenderer.
+        RawJSON подставляется в ответ как есть.
+    """
+
+    encoder_class = RawJSONEncoder
+
+    def get_orjson_options(self):
+        return (
+            orjson.OPT_NON_STR_KEYS
+            | orjson.OPT_PASSTHROUGH_DATETIME
+            | orjson.OPT_PASSTHROUGH_DATACLASS
+        )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (
+            orjson is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        encoder = self.encoder_class()
+        raw = {}
+
+        def default(obj):
+            # Вместо RawJSON пишется уникальная строка, которая затем
+            # заменяется на готовый JSON
+            if isinstance(obj, RawJSON):
+                key = f'raw-json-{uuid4().hex}'
+                raw[f'"{key}"'.encode()] = obj.content
+                return key
+            return encoder.default(obj)
+
+        try:
+            ret = orjson.dumps(
+                data, default=default, option=self.get_orjson_options(),
+            )
+        except orjson.JSONEncodeError:
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        for key, content in raw.items():
+            ret = ret.replace(key, content, 1)
+        # Как и JSONRenderer, экранируем символы U+2028 и U+2029.
+        return ret.replace(
+            b'\xe2\x80\xa8', b'\\u2028'
+        ).replace(
+            b'\xe2\x80\xa9', b'\\u2029'
+        )
@@ -1,10 +1,12 @@
 import base64
+import binascii
 
-import requests
 from django.core.files.base import ContentFile
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from djoser.serializers import UserCreateSerializer, UserSerializer
+from PIL import Image
 from rest_framework import exceptions, serializers
 
 
@@ -12,30 +14,80 @@ from recipes.models import (
     Favorite, Ingredient, Recipe, RecipeIngredient,
     ShoppingCart, Tag
 )
+from recipes.cart import recipe_ingredients, recipe_ingredients_changed
+from recipes.duplicates import find_duplicates, minhash, recipe_tokens
+from recipes.renditions import get_rendition_urls
 from users.models import Subscription, User
+from foodgram_backend.metrics import IMAGE_DECODED_BYTES, IMAGE_PIXELS
 from foodgram_backend.settings import (
     USER_PASSWORD_MAX_LENGTH, RECIPE_MIN_VOL_VALIDATOR,
     RECIPE_ING_MIN_VOL_VALIDATOR, RECIPE_ING_MAX_VOL_VALIDATOR,
-    RECIPE_NAME_MAX_LENGTH, RECIPE_MAX_VOL_VALIDATOR
+    RECIPE_NAME_MAX_LENGTH, RECIPE_MAX_VOL_VALIDATOR,
+    RECIPE_IMAGE_MAX_SIZE, RECIPE_IMAGE_MAX_DIMENSION,
+    RECIPE_DUPLICATES_MODE,
 )
+from .mixins import SparseFieldsMixin
 
 
 class Base64ImageField(serializers.ImageField):
-    """ Работа с изображением в формате base64. """
+    """ Работа с изображением в формате base64 или файлом multipart.
+
+        Размер и разрешение изображения проверяются до его полного
+        декодирования: размер base64 оценивается по длине строки,
+        разрешение читается из заголовка файла.
+    """
+
+    default_error_messages = {
+        'max_size': (
+            f'Размер изображения не должен превышать '
+            f'{RECIPE_IMAGE_MAX_SIZE} байт!'
+        ),
+        'max_dimension': (
+            f'Ширина и высота изображения не должны превышать '
+            f'{RECIPE_IMAGE_MAX_DIMENSION} пикселей!'
+        ),
+    }
 
     def to_internal_value(self, data):
         if (
             isinstance(data, str)
             and data.startswith('data:image')
         ):
-            format, imgstr = data.split(';base64,')
+            if ';base64,' not in data:
+                self.fail('invalid_image')
+            format, imgstr = data.split(';base64,', 1)
+            if len(imgstr) * 3 // 4 > RECIPE_IMAGE_MAX_SIZE:
+                self.fail('max_size')
             ext = format.split('/')[-1]
-            data = ContentFile(
-                base64.b64decode(imgstr),
-                name='temp.' + ext
-            )
+            try:
+                data = ContentFile(
+                    base64.b64decode(imgstr),
+                    name='temp.' + ext
+                )
+            except binascii.Error:
+                self.fail('invalid_image')
+        if getattr(data, 'size', 0) > RECIPE_IMAGE_MAX_SIZE:
+            self.fail('max_size')
+        IMAGE_DECODED_BYTES.observe(getattr(data, 'size', 0) or 0)
+        self.validate_dimensions(data)
         return super().to_internal_value(data)
 
+    def validate_dimensions(self, data):
+        """ Проверка разрешения по заголовку изображения. """
+
+        if not hasattr(data, 'seek'):
+            return
+        try:
+            with Image.open(data) as image:
+                width, height = image.size
+        except Exception:
+            return
+        finally:
+            data.seek(0)
+        IMAGE_PIXELS.observe(width * height)
+        if max(width, height) > RECIPE_IMAGE_MAX_DIMENSION:
+            self.fail('max_dimension')
+
 
 class CustomUserSerializer(UserSerializer):
     """ Проверка подписки. """
@@ -50,6 +102,10 @@ class CustomUserSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        """ Подписка из аннотации queryset, иначе запросом к БД. """
+
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
         if not request:
             return False
@@ -78,13 +134,27 @@ class CustomUserCreateSerializer(UserCreateSerializer):
         )
 
 
-class LimitRecipeSerializer(serializers.ModelSerializer):
+class RecipeImageRenditionsMixin:
+    """ Url уменьшенных копий изображения рецепта по ширине. """
+
+    def get_image_renditions(self, obj):
+        return get_rendition_urls(
+            obj.image_renditions, self.context.get('request')
+        )
+
+
+class LimitRecipeSerializer(
+    RecipeImageRenditionsMixin, serializers.ModelSerializer
+):
     """ Сериализатор для сокращения рецепта! """
 
+    image_renditions = serializers.SerializerMethodField()
+
     class Meta:
         model = Recipe
         fields = (
-            'id', 'name', 'image', 'cooking_time'
+            'id', 'name', 'image', 'image_renditions',
+            'image_placeholder', 'cooking_time',
         )
 
 
@@ -133,13 +203,6 @@ class SubscriptionSerializer(CustomUserSerializer):
             'recipes_count',
         )
 
-    def get_is_subscribed(self, obj):
-        request = self.context.get('request')
-        user = self.context.get('request').user
-        if not request or not user.is_authenticated:
-            return False
-        return obj.followers.filter(user=user).exists()
-
     def get_recipes(self, obj):
         """ Получение списка рецептов автора.
 
@@ -267,8 +330,14 @@ class CreateUpdateRecipeIngredientsSerializer(serializers.ModelSerializer):
         )
 
 
-class RecipeSerializer(serializers.ModelSerializer):
-    """ Работа с рецептами. """
+class RecipeSerializer(
+    SparseFieldsMixin, RecipeImageRenditionsMixin,
+    serializers.ModelSerializer,
+):
+    """ Работа с рецептами.
+
+        Необязательный аргумент fields ограничивает набор полей.
+    """
 
     author = CustomUserSerializer(
         read_only=True
@@ -279,13 +348,11 @@ class RecipeSerializer(serializers.ModelSerializer):
     ingredients = serializers.SerializerMethodField()
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    image_renditions = serializers.SerializerMethodField()
 
     def get_ingredients(self, obj):
-        ingredients = RecipeIngredient.objects.filter(
-            recipe=obj
-        )
         serializer = RecipeIngredientsSerializer(
-            ingredients,
+            obj.recipe_ingredients.all(),
             many=True
         )
         return serializer.data
@@ -293,6 +360,8 @@ class RecipeSerializer(serializers.ModelSerializer):
     def get_is_favorited(self, obj):
         """ Проверка наличия рецепта в избранных. """
 
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         user = self.context.get('request').user.id
         return Favorite.objects.filter(
             user=user,
@@ -302,6 +371,8 @@ class RecipeSerializer(serializers.ModelSerializer):
     def get_is_in_shopping_cart(self, obj):
         """ Проверка наличия рецепта в списке покупок. """
 
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         user = self.context.get('request').user.id
         return ShoppingCart.objects.filter(
             user=user,
@@ -310,7 +381,11 @@ class RecipeSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Recipe
-        exclude = ('pub_date',)
+        fields = (
+            'id', 'author', 'tags', 'ingredients', 'is_favorited',
+            'is_in_shopping_cart', 'name', 'text', 'cooking_time',
+            'image', 'image_renditions', 'image_placeholder',
+        )
 
 
 class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
@@ -378,6 +453,34 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
             )
         return data
 
+    def validate(self, data):
+        """ Поиск вероятных дублей рецепта по MinHash подписи.
+
+            В режиме block дубль - ошибка валидации, в режиме warn
+            id дублей возвращаются в поле possible_duplicates ответа.
+        """
+
+        self.duplicates = []
+        if RECIPE_DUPLICATES_MODE == 'off':
+            return data
+        signature = minhash(recipe_tokens(
+            [item['id'].id for item in data.get('ingredients', ())],
+            data.get('name', getattr(self.instance, 'name', '')),
+            data.get('text', getattr(self.instance, 'text', '')),
+        ))
+        self.duplicates = [
+            recipe_id for recipe_id, _ in find_duplicates(
+                signature, exclude=getattr(self.instance, 'pk', None)
+            )
+        ]
+        if self.duplicates and RECIPE_DUPLICATES_MODE == 'block':
+            raise exceptions.ValidationError({
+                'possible_duplicates': self.duplicates,
+                'errors': 'Похожий рецепт уже опубликован!',
+            })
+        return data
+
+    @transaction.atomic
     def create(self, validated_data):
         """ Создаем рецепт. """
 
@@ -399,6 +502,7 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
         RecipeIngredient.objects.bulk_create(ingredients)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         """ Обновляем рецепт. """
 
@@ -414,6 +518,7 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
             raise exceptions.ValidationError(
                 'Добавьте хотя бы один ингредиент!'
             )
+        old_ingredients = recipe_ingredients(instance.pk)
         instance.ingredients.clear()
         for ingredient in ingredients:
             amount = ingredient.get('amount')
@@ -426,6 +531,7 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
                 ingredient=ingredient,
                 defaults={'amount': amount},
             )
+        recipe_ingredients_changed(instance.pk, old_ingredients)
         return super().update(instance, validated_data)
 
     def to_representation(self, instance):
@@ -435,7 +541,10 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
                 'request': self.context.get('request')
             }
         )
-        return serializer.data
+        data = serializer.data
+        if getattr(self, 'duplicates', None):
+            data['possible_duplicates'] = self.duplicates
+        return data
 
     class Meta:
         model = Recipe
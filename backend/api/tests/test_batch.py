@@ -0,0 +1,70 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from rest_framework.test import APIClient
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def recipe(make_recipe, make_tag):
+    return make_recipe(tags=(make_tag(),))
+
+
+def batch(client, urls):
+    response = client.post(
+        '/api/batch/', {'requests': urls}, format='json'
+    )
+    assert response.status_code == 200, response.content
+    return response.json()
+
+
+def test_mixed_gets(recipe, make_user):
+    client = APIClient()
+    user = make_user()
+    client.force_authenticate(user)
+
+    results = batch(client, [
+        '/api/users/me/', '/api/tags/', f'/api/recipes/{recipe.id}/',
+    ])
+
+    assert [result['status'] for result in results] == [200, 200, 200]
+    assert results[0]['body']['id'] == user.id
+    assert [tag['id'] for tag in results[1]['body']] == [
+        tag.id for tag in recipe.tags.all()
+    ]
+    assert results[2]['body']['id'] == recipe.id
+    assert results[2]['body']['image'] == (
+        f'http://testserver/media/{recipe.image.name}'
+    )
+
+
+def test_error_subresponses(recipe):
+    results = batch(APIClient(), [
+        '/api/users/me/', '/api/recipes/0/', '/api/nowhere/',
+        '/api/batch/', '/admin/', f'/api/recipes/{recipe.id}/',
+    ])
+
+    assert [result['status'] for result in results] == [
+        401, 404, 404, 400, 400, 200,
+    ]
+    assert results[-1]['body']['id'] == recipe.id
+
+
+def test_asgi_subrequest_urls(recipe):
+    @async_to_sync
+    async def post():
+        return await AsyncClient().post(
+            '/api/batch/',
+            {'requests': [f'/api/recipes/{recipe.id}/']},
+            content_type='application/json',
+        )
+
+    response = post()
+
+    assert response.status_code == 200, response.content
+    result, = response.json()
+    assert result['status'] == 200
+    assert result['body']['image'] == (
+        f'http://testserver/media/{recipe.image.name}'
+    )
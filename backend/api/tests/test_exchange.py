@@ -0,0 +1,83 @@
+import json
+
+import pytest
+from django.core.files.base import ContentFile
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def client(make_user):
+    client = APIClient()
+    client.force_authenticate(make_user(is_staff=True))
+    return client
+
+
+@pytest.fixture
+def recipes(settings, tmp_path, make_recipe, make_tag, make_ingredient,
+            png_image):
+    settings.MEDIA_ROOT = tmp_path
+    tag, ingredient = make_tag(), make_ingredient()
+    recipes = [
+        make_recipe(ingredients={ingredient: 5}, tags=(tag,))
+        for _ in range(3)
+    ]
+    for recipe in recipes[:2]:
+        recipe.image.save('red.png', ContentFile(png_image))
+    # Файл третьей картинки в хранилище не сохранен
+    return recipes
+
+
+def export(client, **params):
+    response = client.get('/api/recipes/export/', params)
+    assert response.status_code == 200
+    return [
+        json.loads(line)
+        for line in b''.join(response.streaming_content).splitlines()
+    ]
+
+
+def test_export_image_urls(client, recipes):
+    lines = export(client)
+
+    assert [line['id'] for line in lines] == [recipe.id for recipe in recipes]
+    assert [line['image'] for line in lines] == [
+        f'http://testserver/media/{recipe.image.name}' for recipe in recipes
+    ]
+
+
+def test_export_import_round_trip(client, recipes, caplog):
+    lines = export(client, images='base64')
+
+    assert [line['id'] for line in lines] == [recipe.id for recipe in recipes]
+    assert all(
+        line['image'].startswith('data:image/png;base64,')
+        for line in lines[:2]
+    )
+    assert lines[2]['image'] is None
+    assert recipes[2].image.name in caplog.text
+
+    response = client.post(
+        '/api/recipes/import/',
+        b''.join(json.dumps(line).encode() + b'\n' for line in lines),
+        content_type='application/x-ndjson',
+    )
+
+    assert response.status_code == 201, response.content
+    data = response.json()
+    assert data['created'] == 2
+    assert [error['line'] for error in data['errors']] == [3]
+    imported = Recipe.objects.exclude(
+        pk__in=[recipe.pk for recipe in recipes]
+    ).order_by('pk')
+    # Хранилище с адресацией по содержимому дает то же имя файла
+    assert [
+        (recipe.name, recipe.image.name) for recipe in imported
+    ] == [(recipe.name, recipe.image.name) for recipe in recipes[:2]]
+    assert [
+        list(recipe.recipe_ingredients.values_list('amount', flat=True))
+        for recipe in imported
+    ] == [[5], [5]]
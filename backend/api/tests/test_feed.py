@@ -0,0 +1,69 @@
+from base64 import b64encode
+
+import pytest
+from rest_framework.test import APIClient
+
+from recipes.feed import backfill_feed
+from recipes.models import Recipe
+from users.models import Subscription
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def client(make_user, make_recipe):
+    user, author = make_user(), make_user()
+    for _ in range(5):
+        make_recipe(author=author)
+    Subscription.objects.create(user=user, author=author)
+    # Без коммита сигнал не заполняет ленту
+    backfill_feed(user.id, author.id)
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def cursor(value):
+    return b64encode(value.encode(), altchars=b'-_').decode()
+
+
+def test_feed_pages(client):
+    ids = []
+    url = '/api/recipes/feed/?limit=2'
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200, response.content
+        data = response.json()
+        ids += [recipe['id'] for recipe in data['results']]
+        url = data['next']
+
+    assert ids == list(
+        Recipe.objects.order_by('-pub_date', '-id').values_list(
+            'id', flat=True
+        )
+    )
+
+
+@pytest.mark.parametrize('value', (
+    'garbage',
+    b64encode(b'\xff\xfe', altchars=b'-_').decode(),
+    cursor('2021-06-01T12:00:00|5'),
+    cursor('2021-06-01T12:00:00+00:00'),
+    cursor('2021-06-01T12:00:00+00:00|x'),
+    cursor('2021-06-01T12:00:00+00:00|0'),
+    cursor('2021-06-01T12:00:00+00:00|-1'),
+    cursor(f'2021-06-01T12:00:00+00:00|{2 ** 63}'),
+))
+def test_bad_cursor(client, value):
+    response = client.get('/api/recipes/feed/', {'cursor': value})
+
+    assert response.status_code == 404
+
+
+def test_cursor_after_last_recipe(client):
+    response = client.get('/api/recipes/feed/', {
+        'cursor': cursor(f'2000-01-01T00:00:00+00:00|{2 ** 63 - 1}'),
+    })
+
+    assert response.status_code == 200, response.content
+    assert response.json() == {'next': None, 'results': []}
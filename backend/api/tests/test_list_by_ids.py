@@ -0,0 +1,53 @@
+import pytest
+from rest_framework.test import APIClient
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def recipes(make_recipe):
+    return [make_recipe() for _ in range(2)]
+
+
+def test_ids_in_request_order(recipes):
+    first, second = recipes
+    response = APIClient().get(
+        '/api/recipes/', {'ids': f'{second.id},{first.id},{second.id},0'}
+    )
+
+    assert response.status_code == 400
+
+    response = APIClient().get(
+        '/api/recipes/', {'ids': f'{second.id},{first.id},{second.id},999'}
+    )
+
+    assert response.status_code == 200, response.content
+    data = response.json()
+    assert [recipe['id'] for recipe in data['results']] == [
+        second.id, first.id,
+    ]
+    assert data['missing'] == [999]
+
+
+@pytest.mark.parametrize('params', (
+    {'omit': 'id'}, {'fields': 'name'}, {'fields': 'name', 'omit': 'id,name'},
+))
+def test_ids_with_fields(recipes, params):
+    first, second = recipes
+    response = APIClient().get(
+        '/api/recipes/', {'ids': f'{second.id},{first.id}', **params}
+    )
+
+    assert response.status_code == 200, response.content
+    assert [recipe['id'] for recipe in response.json()['results']] == [
+        second.id, first.id,
+    ]
+
+
+@pytest.mark.parametrize(
+    'ids', ('²', '1,x', '-1', str(2 ** 63), '99999999999999999999999'),
+)
+def test_bad_ids(ids):
+    response = APIClient().get('/api/recipes/', {'ids': ids})
+
+    assert response.status_code == 400
@@ -0,0 +1,48 @@
+import pytest
+from django.core.cache import cache
+
+from api.pagination import EstimatedCountPaginator
+from recipes.models import Tag
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def tags(make_tag):
+    cache.clear()
+    return [make_tag() for _ in range(5)]
+
+
+def test_small_table_counted_exactly():
+    paginator = EstimatedCountPaginator(Tag.objects.order_by('id'), 2)
+
+    assert paginator.counted == (5, False)
+    assert paginator.num_pages == 3
+
+
+def test_large_table_estimated(monkeypatch, tags):
+    monkeypatch.setattr(
+        EstimatedCountPaginator, 'estimate_count',
+        lambda self, queryset: 20000,
+    )
+    paginator = EstimatedCountPaginator(Tag.objects.order_by('id'), 2)
+
+    assert paginator.counted == (20000, True)
+    page = paginator.page(2)
+    assert list(page) == tags[2:4]
+    assert page.has_next()
+    assert not paginator.page(3).has_next()
+
+
+def test_filtered_count_cached(make_tag):
+    queryset = Tag.objects.filter(name__startswith='Тег').order_by('id')
+
+    assert EstimatedCountPaginator(queryset, 2).counted == (5, False)
+    make_tag()
+    # Count из кеша может отстать и помечается приблизительным
+    assert EstimatedCountPaginator(queryset, 2).counted == (5, True)
+    assert EstimatedCountPaginator(
+        queryset.filter(slug__startswith='tag'), 2
+    ).counted == (6, False)
+    cache.clear()
+    assert EstimatedCountPaginator(queryset, 2).counted == (6, False)
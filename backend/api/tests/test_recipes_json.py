@@ -0,0 +1,104 @@
+import pytest
+from django.db import connection
+from rest_framework.test import APIClient
+
+from api import queries, views
+from api.queries import recipes_json
+from recipes.models import Favorite, Recipe, ShoppingCart
+
+pytestmark = [
+    pytest.mark.django_db,
+    pytest.mark.skipif(
+        connection.vendor != 'postgresql',
+        reason='Сборка JSON рецептов в БД работает только на PostgreSQL.',
+    ),
+]
+
+URLS = (
+    '/api/recipes/',
+    '/api/recipes/?fields=tags,ingredients,is_favorited',
+    '/api/recipes/?omit=text',
+    '/api/recipes/?is_in_shopping_cart=1',
+    '/api/recipes/?limit=2&page=2',
+    '/api/recipes/?fields=image,image_renditions',
+)
+
+
+@pytest.fixture
+def user(make_user):
+    return make_user()
+
+
+@pytest.fixture
+def recipes(user, make_tag, make_ingredient, make_recipe):
+    tags = [make_tag() for _ in range(3)]
+    # Новая версия строки первого тега оказывается в конце таблицы
+    tags[0].save()
+    ingredients = [make_ingredient() for _ in range(3)]
+    recipes = [
+        make_recipe(
+            author=user, cooking_time=10 + i,
+            # Связи с тегами создаются не по порядку id тегов
+            tags=reversed(tags[:i + 1]),
+            ingredients={
+                ingredient: j + 1
+                for j, ingredient in enumerate(reversed(ingredients))
+            },
+        )
+        for i in range(4)
+    ]
+    Recipe.objects.filter(pk=recipes[0].pk).update(image_renditions={
+        'source': recipes[0].image.name,
+        'sizes': {
+            '320': {'image': 'recipes/a.png', 'webp': 'recipes/a.webp'},
+            '1280': {'image': 'recipes/b.png', 'webp': 'recipes/b.webp'},
+        },
+    })
+    Favorite.objects.create(user=user, recipe=recipes[0])
+    ShoppingCart.objects.create(user=user, recipe=recipes[1])
+    return recipes
+
+
+def get_recipes(client, url, monkeypatch, db_json):
+    monkeypatch.setattr(queries, 'RECIPES_DB_JSON', db_json)
+    response = client.get(url)
+    assert response.status_code == 200, response.content
+    return response.json()
+
+
+@pytest.mark.parametrize('url', URLS)
+@pytest.mark.parametrize('authenticated', (False, True))
+def test_recipes_json_matches_serializer(
+    url, authenticated, user, recipes, monkeypatch,
+):
+    client = APIClient()
+    if authenticated:
+        client.force_authenticate(user)
+    assert (
+        get_recipes(client, url, monkeypatch, True)
+        == get_recipes(client, url, monkeypatch, False)
+    )
+
+
+def test_db_json_rendered_unchanged(user, recipes, monkeypatch):
+    contents = []
+
+    def spy(*args):
+        contents.append(recipes_json(*args))
+        return contents[-1]
+    monkeypatch.setattr(views, 'recipes_json', spy)
+    client = APIClient()
+    client.force_authenticate(user)
+
+    response = client.get('/api/recipes/', {'limit': 3})
+
+    assert response.status_code == 200, response.content
+    content, = contents
+    assert content in response.content
+    results = response.json()['results']
+    assert [recipe['id'] for recipe in results] == [
+        recipe.id for recipe in reversed(recipes[1:])
+    ]
+    assert results[0]['image'] == (
+        f'http://testserver/media/{recipes[3].image.name}'
+    )
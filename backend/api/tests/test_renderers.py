@@ -0,0 +1,29 @@
+import json
+
+import pytest
+
+from api.renderers import ORJSONRenderer, RawJSON
+
+DATA = {'count': 2, 'results': RawJSON('[{"id" : 1}, \n {"id" : 2}]'.encode())}
+
+
+def test_raw_json_inserted_unchanged():
+    content = ORJSONRenderer().render(DATA)
+
+    assert content == (
+        b'{"count":2,"results":[{"id" : 1}, \n {"id" : 2}]}'
+    )
+
+
+@pytest.mark.parametrize('media_type', (
+    'application/json; indent=2', 'application/json',
+))
+def test_raw_json_in_json_renderer(media_type, monkeypatch):
+    if media_type == 'application/json':
+        monkeypatch.setattr('api.renderers.orjson', None)
+
+    content = ORJSONRenderer().render(DATA, media_type)
+
+    assert json.loads(content) == {
+        'count': 2, 'results': [{'id': 1}, {'id': 2}],
+    }
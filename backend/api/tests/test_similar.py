@@ -0,0 +1,35 @@
+import pytest
+from rest_framework.test import APIClient
+
+from recipes.models import SimilarRecipe
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def recipes(monkeypatch, make_recipe):
+    monkeypatch.setattr('api.views.SIMILAR_RECIPES_COUNT', 3)
+    recipes = [make_recipe() for _ in range(6)]
+    SimilarRecipe.objects.bulk_create(
+        SimilarRecipe(recipe=recipes[0], similar=recipe, score=1 / i)
+        for i, recipe in enumerate(recipes[1:], 1)
+    )
+    return recipes
+
+
+@pytest.mark.parametrize('limit, count', (
+    ('2', 2), ('100', 3), ('', 3), ('0', 3), ('-1', 3), ('²', 3), ('x', 3),
+))
+def test_similar_limit(recipes, limit, count):
+    response = APIClient().get(
+        f'/api/recipes/{recipes[0].id}/similar/', {'limit': limit}
+    )
+
+    assert response.status_code == 200, response.content
+    assert [recipe['id'] for recipe in response.json()] == [
+        recipe.id for recipe in recipes[1:count + 1]
+    ]
+
+
+def test_similar_unknown_recipe():
+    assert APIClient().get('/api/recipes/x/similar/').status_code == 404
@@ -0,0 +1,32 @@
+from base64 import b64encode
+from datetime import datetime
+
+import pytest
+from rest_framework.test import APIClient
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def client(make_user):
+    client = APIClient()
+    client.force_authenticate(make_user())
+    return client
+
+
+@pytest.mark.parametrize('limit', ('', '0', '²', 'x', '100000'))
+def test_sync_limit(client, limit):
+    since = client.get('/api/sync/').json()['token']
+
+    response = client.get('/api/sync/', {'since': since, 'limit': limit})
+
+    assert response.status_code == 200, response.content
+    assert response.json()['has_more'] is False
+
+
+def test_sync_naive_token(client):
+    since = b64encode(
+        f'1|{datetime.now().isoformat()}'.encode(), altchars=b'-_'
+    ).decode()
+
+    assert client.get('/api/sync/', {'since': since}).status_code == 400
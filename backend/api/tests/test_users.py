@@ -0,0 +1,87 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.pagination import EstimatedCountPaginator
+from users.models import Subscription
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def users(make_user):
+    users = [
+        make_user(username=username, first_name=first_name)
+        for username, first_name in (
+            ('boris', 'Борис'), ('anna', 'Анна'), ('vera', 'Вера'),
+            ('alex', 'Петр'),
+        )
+    ]
+    Subscription.objects.create(user=users[0], author=users[1])
+    Subscription.objects.create(user=users[0], author=users[3])
+    return users
+
+
+def get_users(client, **params):
+    response = client.get('/api/users/', params)
+    assert response.status_code == 200, response.content
+    return response.json()
+
+
+def test_limit_paginates_by_username(users):
+    data = get_users(APIClient(), limit=2)
+
+    assert data['count'] == 4
+    assert data['count_approximate'] is False
+    assert data['next'] is not None
+    assert [user['username'] for user in data['results']] == [
+        'alex', 'anna',
+    ]
+    assert [
+        user['username']
+        for user in get_users(APIClient(), limit=2, page=2)['results']
+    ] == ['boris', 'vera']
+
+
+def test_is_subscribed_in_one_query(users, make_user):
+    client = APIClient()
+    client.force_authenticate(users[0])
+
+    with CaptureQueriesContext(connection) as queries:
+        data = get_users(client)
+    for _ in range(5):
+        make_user()
+    with CaptureQueriesContext(connection) as more_queries:
+        get_users(client)
+
+    assert len(more_queries) == len(queries)
+    assert {
+        user['username']: user['is_subscribed'] for user in data['results']
+    } == {'alex': True, 'anna': True, 'boris': False, 'vera': False}
+
+
+@pytest.mark.parametrize('search, expected', [
+    ('a', ['alex', 'anna']),
+    ('AN', ['anna']),
+    ('Ве', ['vera']),
+    ('Пе', ['alex']),
+    ('nna', []),
+])
+def test_prefix_search(users, search, expected):
+    data = get_users(APIClient(), search=search)
+
+    assert [user['username'] for user in data['results']] == expected
+
+
+def test_estimated_count_marked(users, monkeypatch):
+    monkeypatch.setattr(
+        EstimatedCountPaginator, 'estimate_count',
+        lambda self, queryset: 20000,
+    )
+    data = get_users(APIClient(), limit=2)
+
+    assert data['count'] == 20000
+    assert data['count_approximate'] is True
+    assert data['next'] is not None
+    assert get_users(APIClient(), limit=2, page=2)['next'] is None
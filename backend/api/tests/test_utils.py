@@ -0,0 +1,25 @@
+import re
+from io import BytesIO
+
+import pytest
+from prometheus_client import REGISTRY
+
+from api.utils import shopping_cart_to_pdf
+
+
+def pages_observed():
+    return REGISTRY.get_sample_value('foodgram_pdf_pages_sum') or 0
+
+
+@pytest.mark.parametrize('rows, pages', ((0, 1), (30, 1), (100, 3)))
+def test_shopping_cart_pages(rows, pages):
+    cart = [
+        {'name': f'Ингредиент {i}', 'amount': i, 'measurement_unit': 'г'}
+        for i in range(rows)
+    ]
+    observed = pages_observed()
+
+    content = shopping_cart_to_pdf(BytesIO(), cart).getvalue()
+
+    assert len(re.findall(rb'/Type /Page\b(?!s)', content)) == pages
+    assert pages_observed() - observed == pages
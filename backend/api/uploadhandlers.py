@@ -0,0 +1,16 @@
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+
+from foodgram_backend.settings import RECIPE_IMAGE_MAX_SIZE
+
+
+class LimitedTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """ Потоковая запись загружаемого файла во временный файл.
+
+        Данные сверх RECIPE_IMAGE_MAX_SIZE не записываются, но
+        учитываются в размере файла, поэтому слишком большой файл
+        отклоняется валидацией без чтения его в память.
+    """
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) <= RECIPE_IMAGE_MAX_SIZE:
+            self.file.write(raw_data)
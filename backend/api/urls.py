@@ -1,9 +1,11 @@
 from django.urls import include, path
 from rest_framework import routers
 
+from foodgram_backend.settings import ASYNC_VIEWS
+from .async_views import async_urls
 from .views import (
-    CustomUserViewSet, IngredientViewSet, RecipeViewSet,
-    TagViewSet,
+    BatchViewSet, CustomUserViewSet, IngredientViewSet, RecipeViewSet,
+    SyncViewSet, TagViewSet,
 )
 
 app_name = 'api'
@@ -14,8 +16,14 @@ router.register('users', CustomUserViewSet, basename='users')
 router.register('tags', TagViewSet, basename='tags')
 router.register('ingredients', IngredientViewSet, basename='Ingredients')
 router.register('recipes', RecipeViewSet, basename='recipes')
+router.register('sync', SyncViewSet, basename='sync')
+router.register('batch', BatchViewSet, basename='batch')
+
+router_urls = router.urls
+if ASYNC_VIEWS:
+    router_urls = async_urls(router_urls)
 
 urlpatterns = [
-    path('', include(router.urls)),
+    path('', include(router_urls)),
     path('auth/', include('djoser.urls.authtoken')),
 ]
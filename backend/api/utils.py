@@ -1,34 +1,78 @@
+import time
+from functools import lru_cache
+
 from django.conf import settings
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfgen import canvas
 
-from recipes.models import Ingredient
+from foodgram_backend.metrics import PDF_PAGES, PDF_RENDER_SECONDS
 
+PDF_FONT = 'ArialRegular'
+# Границы строк списка на странице A4 высотой 842 пункта
+PDF_TOP = 800
+PDF_BOTTOM = 40
+
+
+def parse_limit(value, default, maximum):
+    """ Лимит из параметра запроса не больше maximum.
+
+        Пустое, нечисловое и меньшее единицы значение заменяется на
+        default.
+    """
+
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        return default
+    if limit < 1:
+        return default
+    return min(limit, maximum)
+
+
+@lru_cache()
+def register_pdf_font():
+    """ Разбор и регистрация шрифта PDF один раз на процесс.
+
+        reportlab импортируется здесь, а не при импорте модуля: он
+        нужен только для выгрузки списка покупок.
+    """
+
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
 
-def shopping_cart_to_pdf(response, cart):
-    pdf = canvas.Canvas(response)
     pdfmetrics.registerFont(
         TTFont(
-            'ArialRegular',
+            PDF_FONT,
             f'{str(settings.BASE_DIR)}/data/ArialRegular.ttf'
         )
     )
-    pdf.setFont('ArialRegular', 32)
+
+
+def shopping_cart_to_pdf(response, cart):
+    """ Список покупок в PDF, строки переносятся на новые страницы. """
+
+    from reportlab.pdfgen import canvas
+
+    started = time.perf_counter()
+    register_pdf_font()
+    pdf = canvas.Canvas(response)
+    pdf.setFont(PDF_FONT, 32)
     pdf.drawString(15, 800, 'Список покупок: ')
-    pdf.setFont('ArialRegular', 15)
+    pdf.setFont(PDF_FONT, 15)
+    pages = 1
     row_step = 750
     for item in cart:
-        ingredient = Ingredient.objects.get(
-            id=item['ingredient']
-        )
-        amount = item['amount']
+        if row_step < PDF_BOTTOM:
+            pdf.showPage()
+            pdf.setFont(PDF_FONT, 15)
+            pages += 1
+            row_step = PDF_TOP
         shopping_row = (
-            f'{ingredient.name}: {amount}, '
-            f'{ingredient.measurement_unit}'
+            f'{item["name"]}: {item["amount"]}, '
+            f'{item["measurement_unit"]}'
         )
         pdf.drawString(15, row_step, f' - {shopping_row}')
         row_step -= 20
     pdf.showPage()
     pdf.save()
+    PDF_PAGES.observe(pages)
+    PDF_RENDER_SECONDS.observe(time.perf_counter() - started)
     return response
@@ -1,24 +1,43 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+import json
+from functools import partial
+
+from django.db.models import (
+    BooleanField, Exists, F, OuterRef, Prefetch, Value,
+)
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import (
-    AllowAny, IsAuthenticated,
+    AllowAny, IsAdminUser, IsAuthenticated,
     IsAuthenticatedOrReadOnly
 )
 from rest_framework.response import Response
 
+from foodgram_backend.settings import (
+    BATCH_MAX_REQUESTS, RECIPE_PK_MAX, RECIPES_IDS_MAX,
+    SIMILAR_RECIPES_COUNT, SYNC_PAGE_SIZE,
+)
+from recipes.feed import get_feed_page
+from recipes.pantry import pantry_index
 from recipes.models import (
-    Favorite, Ingredient, Recipe, RecipeIngredient,
-    ShoppingCart, Tag,
+    CartTotal, Favorite, Ingredient, Recipe, RecipeIngredient,
+    ShoppingCart, SimilarRecipe, Tag,
+)
+from recipes.popularity import (
+    DEFAULT_POPULARITY_WINDOW, POPULARITY_WINDOWS, trending_recipe_ids,
+)
+from recipes.sync import (
+    SyncTokenExpired, current_token, get_changes,
 )
 from users.models import Subscription, User
 
+from .batch import dispatch_get
+from .exchange import export_recipes, import_recipes
 from .filters import IngredientFilter, RecipeFilter, UserFilter
-from .pagination import LimitPagination
+from .pagination import LimitPagination, PubDateCursorPagination
 from .permissions import IsAdminAuthorOrReadOnly
 from .serializers import (
     IngredientSerializer,
@@ -27,7 +46,9 @@ from .serializers import (
     CustomUserSerializer, FavoriteCartSerializer,
 )
 from .mixins import CheckIntOrStrMixin
-from .utils import shopping_cart_to_pdf
+from .queries import recipes_json, recipes_json_enabled
+from .renderers import RawJSON
+from .utils import parse_limit, shopping_cart_to_pdf
 
 
 class CustomUserViewSet(UserViewSet, CheckIntOrStrMixin):
@@ -35,6 +56,21 @@ class CustomUserViewSet(UserViewSet, CheckIntOrStrMixin):
     filter_backends = (DjangoFilterBackend,)
     filterset_class = UserFilter
 
+    def get_queryset(self):
+        """ Пользователи по username с подпиской одним подзапросом. """
+
+        queryset = super().get_queryset().order_by('username')
+        user = self.request.user
+        if self.action in ('list', 'retrieve') and user.is_authenticated:
+            queryset = queryset.annotate(
+                is_subscribed=Exists(
+                    Subscription.objects.filter(
+                        user=user, author=OuterRef('pk')
+                    )
+                ),
+            )
+        return queryset
+
     @action(
         detail=False,
         methods=('get',),
@@ -58,7 +94,9 @@ class CustomUserViewSet(UserViewSet, CheckIntOrStrMixin):
         """ Список авторов, на которых подписан пользователь. """
 
         user = self.request.user
-        queryset = User.objects.filter(followings__user=user)
+        queryset = User.objects.filter(followings__user=user).annotate(
+            is_subscribed=Value(True, output_field=BooleanField())
+        ).order_by('username')
         pages = self.paginate_queryset(
             queryset
         )
@@ -144,8 +182,170 @@ class RecipeViewSet(viewsets.ModelViewSet, CheckIntOrStrMixin):
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
 
+    list_actions = ('list', 'feed', 'trending', 'similar', 'pantry')
+    list_fields = (
+        'id', 'author', 'tags', 'is_favorited', 'is_in_shopping_cart',
+        'name', 'cooking_time', 'image', 'image_renditions',
+        'image_placeholder',
+    )
+
+    def get_recipe_fields(self):
+        """ Поля рецепта в ответе.
+
+            Параметр fields задает набор полей, omit исключает поля,
+            id отдается всегда. По умолчанию списки рецептов
+            (list_actions) отдаются без описания и ингредиентов
+            (list_fields), остальные действия - целиком.
+        """
+
+        all_fields = RecipeSerializer.Meta.fields
+        if self.action not in ('retrieve', *self.list_actions):
+            return all_fields
+        query_params = self.request.query_params
+        if 'fields' in query_params:
+            fields = set()
+            for value in query_params.getlist('fields'):
+                fields.update(value.split(','))
+        elif self.action in self.list_actions:
+            fields = set(self.list_fields)
+        else:
+            fields = set(all_fields)
+        for value in query_params.getlist('omit'):
+            fields.difference_update(value.split(','))
+        # По id собираются ответы ids, pantry и similar
+        fields.add('id')
+        return tuple(name for name in all_fields if name in fields)
+
+    def get_queryset(self):
+        user = self.request.user.id
+        fields = self.get_recipe_fields()
+        queryset = Recipe.objects.select_related('author')
+        if 'text' not in fields:
+            queryset = queryset.defer('text')
+        if 'tags' in fields:
+            queryset = queryset.prefetch_related(
+                Prefetch('tags', queryset=Tag.objects.order_by('id')),
+            )
+        if 'ingredients' in fields:
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    'recipe_ingredients',
+                    queryset=RecipeIngredient.objects.select_related(
+                        'ingredient'
+                    ).order_by('id'),
+                ),
+            )
+        if 'is_favorited' in fields:
+            queryset = queryset.annotate(
+                is_favorited=Exists(
+                    Favorite.objects.filter(user=user, recipe=OuterRef('pk'))
+                ),
+            )
+        if 'is_in_shopping_cart' in fields:
+            queryset = queryset.annotate(
+                is_in_shopping_cart=Exists(
+                    ShoppingCart.objects.filter(
+                        user=user, recipe=OuterRef('pk')
+                    )
+                ),
+            )
+        return queryset.order_by('-pub_date')
+
+    def get_serializer(self, *args, **kwargs):
+        if self.get_serializer_class() is RecipeSerializer:
+            kwargs.setdefault('fields', self.get_recipe_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def get_recipes_data(self, ids, raw=True):
+        """ Рецепты с id из ids в том же порядке.
+
+            На PostgreSQL JSON собирается в БД и с raw отдается в ответ
+            без разбора (RawJSON), иначе рецепты сериализуются через
+            RecipeSerializer. Без raw возвращается список словарей.
+        """
+
+        fields = self.get_recipe_fields()
+        if recipes_json_enabled():
+            content = recipes_json(ids, self.request, fields)
+            return RawJSON(content) if raw else json.loads(content)
+        recipes = self.get_queryset().in_bulk(ids)
+        return self.get_serializer(
+            [recipes[pk] for pk in ids if pk in recipes], many=True
+        ).data
+
+    def list(self, request, *args, **kwargs):
+        """ Список рецептов.
+
+            На PostgreSQL JSON страницы собирается одним запросом в БД,
+            иначе рецепты сериализуются через RecipeSerializer.
+            С параметром ids отдаются рецепты по списку id.
+        """
+
+        if 'ids' in request.query_params:
+            return self.list_by_ids(request)
+        if not recipes_json_enabled():
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(
+            queryset.prefetch_related(None).values_list('pk', flat=True)
+        )
+        return self.get_paginated_response(RawJSON(
+            recipes_json(page, request, self.get_recipe_fields())
+        ))
+
+    def list_by_ids(self, request):
+        """ Рецепты ids=1,2,3 в порядке запроса без пагинации.
+
+            Остальные фильтры не применяются, отсутствующие id
+            возвращаются в поле missing.
+        """
+
+        try:
+            ids = [
+                int(value) for param in request.query_params.getlist('ids')
+                for value in param.split(',') if value
+            ]
+        except ValueError:
+            ids = None
+        # Значения вне диапазона BigAutoField не могут быть id рецептов
+        if not ids or not all(0 < pk <= RECIPE_PK_MAX for pk in ids):
+            return Response(
+                {
+                    'errors': 'Укажите id рецептов через запятую '
+                              'в параметре ids.'
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        ids = list(dict.fromkeys(ids))
+        if len(ids) > RECIPES_IDS_MAX:
+            return Response(
+                {'errors': f'Не больше {RECIPES_IDS_MAX} id за запрос.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        recipes = self.get_recipes_data(ids, raw=False)
+        found = {recipe['id'] for recipe in recipes}
+        return Response({
+            'results': recipes,
+            'missing': [pk for pk in ids if pk not in found],
+        })
+
+    @action(
+        detail=False,
+        methods=('get',),
+        permission_classes=(IsAuthenticated,),
+        pagination_class=PubDateCursorPagination,
+    )
+    def feed(self, request):
+        """ Лента рецептов авторов, на которых подписан пользователь.
+
+            Курсорная пагинация по дате публикации.
+        """
+
+        ids = self.paginate_queryset(partial(get_feed_page, request.user))
+        return self.get_paginated_response(self.get_recipes_data(ids))
+
     def get_serializer_class(self):
-        if self.action in ('list', 'retrieve'):
+        if self.action in ('retrieve', *self.list_actions):
             return RecipeSerializer
         return RecipeCreateUpdateSerializer
 
@@ -195,6 +395,107 @@ class RecipeViewSet(viewsets.ModelViewSet, CheckIntOrStrMixin):
             status=status.HTTP_204_NO_CONTENT
         )
 
+    @action(
+        detail=False,
+        methods=('get',),
+    )
+    def trending(self, request):
+        """ Популярные рецепты за окно window=24h|7d.
+
+            Рейтинг - число добавлений в избранное и покупки, читается
+            только из почасовой статистики.
+        """
+
+        window = request.query_params.get(
+            'window', DEFAULT_POPULARITY_WINDOW
+        )
+        if window not in POPULARITY_WINDOWS:
+            return Response(
+                {
+                    'errors': f'Окно window может быть одним из: '
+                              f'{", ".join(POPULARITY_WINDOWS)}'
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        ids = self.paginate_queryset(trending_recipe_ids(window))
+        return self.get_paginated_response(self.get_recipes_data(ids))
+
+    @action(
+        detail=False,
+        methods=('get',),
+    )
+    def pantry(self, request):
+        """ Рецепты по продуктам в наличии.
+
+            ingredients - id ингредиентов через запятую, tags - слаги
+            тегов как в списке рецептов. Рецепты упорядочены по доле
+            имеющихся ингредиентов (coverage), затем по числу
+            недостающих (missing), поиск идет по индексу в памяти.
+        """
+
+        try:
+            ingredients = {
+                int(value)
+                for param in request.query_params.getlist('ingredients')
+                for value in param.split(',') if value
+            }
+        except ValueError:
+            ingredients = None
+        if not ingredients:
+            return Response(
+                {
+                    'errors': 'Укажите id ингредиентов через запятую '
+                              'в параметре ingredients.'
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        tags = None
+        if request.query_params.get('tags'):
+            tags = Tag.objects.filter(
+                slug__in=request.query_params.getlist('tags')
+            ).values_list('id', flat=True)
+        results = self.paginate_queryset(pantry_index.search(
+            ingredients, tags
+        ))
+        recipes = self.get_recipes_data(
+            [recipe_id for _, _, recipe_id in results], raw=False
+        )
+        scores = {
+            recipe_id: (coverage, missing)
+            for coverage, missing, recipe_id in results
+        }
+        for recipe in recipes:
+            recipe['coverage'], recipe['missing'] = scores[recipe['id']]
+        return self.get_paginated_response(recipes)
+
+    @action(
+        detail=True,
+        methods=('get',),
+        pagination_class=None,
+    )
+    def similar(self, request, pk):
+        """ Похожие рецепты по ингредиентам и тегам.
+
+            Соседи читаются из предрассчитанной таблицы, которую
+            обновляет команда refresh_similar.
+        """
+
+        if (
+            not self.validate_pk(pk)
+            or not Recipe.objects.filter(id=pk).exists()
+        ):
+            return Response(
+                status=status.HTTP_404_NOT_FOUND
+            )
+        limit = parse_limit(
+            request.query_params.get('limit'),
+            SIMILAR_RECIPES_COUNT, SIMILAR_RECIPES_COUNT,
+        )
+        ids = list(SimilarRecipe.objects.filter(recipe=pk).order_by(
+            '-score', 'similar'
+        ).values_list('similar', flat=True)[:limit])
+        return Response(self.get_recipes_data(ids))
+
     @action(
         detail=True,
         methods=('post', 'delete'),
@@ -255,20 +556,135 @@ class RecipeViewSet(viewsets.ModelViewSet, CheckIntOrStrMixin):
     def download_shopping_cart(self, request):
         """ Отдача пользователю списка покупок в формате pdf. """
 
-        shopping_cart = ShoppingCart.objects.filter(
+        cart = CartTotal.objects.filter(
             user=self.request.user
-        )
-        recipes = [item.recipe.id for item in shopping_cart]
-        cart = (
-            RecipeIngredient.objects.filter(
-                recipe__in=recipes
-            ).values('ingredient').annotate(
-                amount=Sum('amount')
-            )
-        )
+        ).values(
+            'amount',
+            name=F('ingredient__name'),
+            measurement_unit=F('ingredient__measurement_unit'),
+        ).order_by('ingredient__name')
         response = HttpResponse(content_type='application/pdf')
         response[
             'Content-Disposition'
         ] = 'attachment; filename="ShoppingCart.pdf"'
         shopping_cart_to_pdf(response, cart)
         return response
+
+    @action(
+        detail=False,
+        methods=('get',),
+        permission_classes=(IsAdminUser,),
+    )
+    def export(self, request):
+        """ Потоковая выгрузка всех рецептов в NDJSON для персонала.
+
+            С images=base64 картинки встраиваются в data URI, и
+            выгрузку можно загрузить обратно через import.
+        """
+
+        return StreamingHttpResponse(
+            export_recipes(
+                request, request.query_params.get('images') == 'base64'
+            ),
+            content_type='application/x-ndjson',
+        )
+
+    @action(
+        detail=False,
+        methods=('post',),
+        permission_classes=(IsAdminUser,),
+        url_path='import',
+        url_name='import',
+    )
+    def bulk_import(self, request):
+        """ Загрузка рецептов из NDJSON в формате выгрузки. """
+
+        if request.stream is None:
+            return Response(
+                {'errors': 'Передайте рецепты в NDJSON в теле запроса.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        created, errors, truncated = import_recipes(request, request.stream)
+        return Response(
+            {'created': created, 'errors': errors, 'truncated': truncated},
+            status=(
+                status.HTTP_201_CREATED if created
+                else status.HTTP_400_BAD_REQUEST
+            ),
+        )
+
+
+class SyncViewSet(viewsets.ViewSet):
+    """ Изменения избранного, списка покупок, подписок и рецептов.
+
+        Без since отдается текущий токен: клиент загружает данные
+        целиком и дальше запрашивает только изменения после токена.
+        Для объектов возвращаются id: рецепты - id рецептов,
+        подписки - id авторов.
+    """
+
+    permission_classes = (IsAuthenticated,)
+
+    def list(self, request):
+        since = request.query_params.get('since')
+        if not since:
+            return Response({'token': current_token()})
+        limit = parse_limit(
+            request.query_params.get('limit'), SYNC_PAGE_SIZE, SYNC_PAGE_SIZE
+        )
+        try:
+            changes, token, has_more = get_changes(
+                request.user, since, limit
+            )
+        except SyncTokenExpired:
+            return Response(
+                {'errors': 'Токен устарел, загрузите данные заново.'},
+                status=status.HTTP_410_GONE,
+            )
+        except ValueError:
+            return Response(
+                {'errors': 'Неверный токен синхронизации.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response({'token': token, 'has_more': has_more, **changes})
+
+
+class BatchViewSet(viewsets.ViewSet):
+    """ Несколько GET запросов к api одним запросом.
+
+        Тело: {"requests": ["/api/users/me/", "/api/tags/", ...]}.
+        Подзапросы выполняются по очереди с пользователем основного
+        запроса, ответ - список {"path", "status", "body"} в том же
+        порядке.
+    """
+
+    permission_classes = (AllowAny,)
+
+    def create(self, request):
+        urls = request.data.get('requests') if isinstance(
+            request.data, dict
+        ) else None
+        if (
+            not isinstance(urls, list)
+            or not urls
+            or not all(isinstance(url, str) for url in urls)
+        ):
+            return Response(
+                {'errors': 'Передайте список адресов в поле requests.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(urls) > BATCH_MAX_REQUESTS:
+            return Response(
+                {
+                    'errors': f'Не больше {BATCH_MAX_REQUESTS} '
+                              f'подзапросов за раз.'
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        results = []
+        for url in urls:
+            response_status, body = dispatch_get(request, url)
+            results.append(
+                {'path': url, 'status': response_status, 'body': body}
+            )
+        return Response(results)
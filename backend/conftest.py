@@ -0,0 +1,106 @@
+from io import BytesIO
+from itertools import count
+
+import pytest
+from PIL import Image
+
+# Номера для уникальных имен, email, цветов и слагов во всех тестах
+numbers = count(1)
+
+
+@pytest.fixture(autouse=True)
+def primary_database(request, monkeypatch):
+    """ Без маркера replicas все чтения идут в основную БД. """
+
+    if request.node.get_closest_marker('replicas') is None:
+        from foodgram_backend import replicas
+        monkeypatch.setattr(replicas, 'replica_aliases', list)
+
+
+@pytest.fixture
+def make_user(db):
+    """ Фабрика пользователей с паролем pass. """
+
+    from users.models import User
+
+    def make_user(**fields):
+        number = next(numbers)
+        return User.objects.create_user(**{
+            'username': f'user{number}',
+            'email': f'user{number}@foodgram.ru',
+            'password': 'pass',
+            'first_name': 'Иван',
+            'last_name': 'Иванов',
+            **fields,
+        })
+    return make_user
+
+
+@pytest.fixture
+def make_tag(db):
+    from recipes.models import Tag
+
+    def make_tag(**fields):
+        number = next(numbers)
+        return Tag.objects.create(**{
+            'name': f'Тег {number}',
+            'color': f'#{number:06X}',
+            'slug': f'tag{number}',
+            **fields,
+        })
+    return make_tag
+
+
+@pytest.fixture
+def make_ingredient(db):
+    from recipes.models import Ingredient
+
+    def make_ingredient(**fields):
+        return Ingredient.objects.create(**{
+            'name': f'продукт {next(numbers)}',
+            'measurement_unit': 'г',
+            **fields,
+        })
+    return make_ingredient
+
+
+@pytest.fixture
+def make_recipe(make_user):
+    """ Фабрика рецептов.
+
+        ingredients - ингредиенты (количество 1) или словарь
+        {ингредиент: количество}, tags - теги, связи создаются в
+        переданном порядке.
+    """
+
+    from recipes.models import Recipe, RecipeIngredient, RecipeTags
+
+    def make_recipe(author=None, ingredients=(), tags=(), **fields):
+        number = next(numbers)
+        recipe = Recipe.objects.create(**{
+            'name': f'Рецепт {number}',
+            'text': 'Описание',
+            'cooking_time': 10,
+            'image': f'recipes/{number}.png',
+            'author': author or make_user(),
+            **fields,
+        })
+        if not isinstance(ingredients, dict):
+            ingredients = dict.fromkeys(ingredients, 1)
+        for ingredient, amount in ingredients.items():
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=ingredient, amount=amount,
+            )
+        for tag in tags:
+            RecipeTags.objects.create(recipe=recipe, tag=tag)
+        return recipe
+    return make_recipe
+
+
+@pytest.fixture
+def png_image():
+    """ PNG 64x48 для загрузки изображений рецептов. """
+
+    content = BytesIO()
+    Image.new('RGB', (64, 48), 'red').save(content, 'PNG')
+    return content.getvalue()
@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.db import connections
+
+
+def check_connections(**kwargs):
+    """ Закрытие неработающих постоянных соединений в начале запроса.
+
+        Аналог CONN_HEALTH_CHECKS из Django 4.1: соединение, которое
+        оборвал сервер БД или pgbouncer, закрывается до первого
+        запроса к БД, и Django открывает новое.
+    """
+
+    if not settings.DB_HEALTH_CHECKS:
+        return
+    for connection in connections.all():
+        if connection.connection is not None and not connection.is_usable():
+            connection.close()
@@ -0,0 +1,188 @@
+import asyncio
+import hmac
+import os
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram,
+    generate_latest, multiprocess,
+)
+
+REQUEST_LATENCY = Histogram(
+    'foodgram_request_duration_seconds',
+    'Время обработки запроса',
+    ('view', 'method', 'status'),
+)
+REQUEST_DB_QUERIES = Histogram(
+    'foodgram_request_db_queries',
+    'Запросов к БД за запрос',
+    ('view',),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100, 200),
+)
+REQUEST_DB_SECONDS = Histogram(
+    'foodgram_request_db_seconds',
+    'Время запросов к БД за запрос',
+    ('view',),
+)
+CACHE_REQUESTS = Counter(
+    'foodgram_cache_requests_total',
+    'Обращения к кешу',
+    ('cache', 'result'),
+)
+PDF_RENDER_SECONDS = Histogram(
+    'foodgram_pdf_render_seconds',
+    'Время построения PDF списка покупок',
+)
+PDF_PAGES = Histogram(
+    'foodgram_pdf_pages',
+    'Страниц в PDF списка покупок',
+    buckets=(1, 2, 3, 5, 10, 20),
+)
+IMAGE_DECODED_BYTES = Histogram(
+    'foodgram_image_decoded_bytes',
+    'Размер загруженных изображений после декодирования',
+    buckets=(10 ** 4, 10 ** 5, 5 * 10 ** 5, 10 ** 6, 2 * 10 ** 6, 5 * 10 ** 6),
+)
+IMAGE_PIXELS = Histogram(
+    'foodgram_image_pixels',
+    'Разрешение загруженных изображений в пикселях',
+    buckets=(10 ** 5, 10 ** 6, 4 * 10 ** 6, 10 ** 7, 2.5 * 10 ** 7),
+)
+
+
+class QueryStats:
+    """ Количество и время запросов к БД текущего HTTP запроса. """
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+current_query_stats = ContextVar('current_query_stats', default=None)
+
+
+def query_wrapper(execute, sql, params, many, context):
+    """ Учет запроса к БД в статистике текущего HTTP запроса.
+
+        Статистика передается через ContextVar, поэтому учитываются
+        и запросы из потоков sync_to_async.
+    """
+
+    stats = current_query_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.count += 1
+        stats.seconds += time.perf_counter() - started
+
+
+def install_query_wrapper(connection, **kwargs):
+    """ Обработчик connection_created. """
+
+    if query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_wrapper)
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def view_name(request):
+    """ Метка представления: ViewSet.action, admin или unknown. """
+
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unknown'
+    if match.namespace == 'admin':
+        return 'admin'
+    func = match.func
+    cls = getattr(func, 'cls', getattr(func, 'view_class', None))
+    if cls is None:
+        return f'{func.__module__}.{func.__name__}'
+    actions = getattr(func, 'actions', None) or {}
+    action = actions.get(request.method.lower(), request.method.lower())
+    return f'{cls.__name__}.{action}'
+
+
+class MetricsMiddleware:
+    """ Время запроса и запросы к БД по представлениям. """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Как в MiddlewareMixin: экземпляр вызывается как корутина
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def observe(self, request, response, started, stats):
+        view = view_name(request)
+        REQUEST_LATENCY.labels(
+            view, request.method, response.status_code
+        ).observe(time.perf_counter() - started)
+        REQUEST_DB_QUERIES.labels(view).observe(stats.count)
+        REQUEST_DB_SECONDS.labels(view).observe(stats.seconds)
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        started, stats = time.perf_counter(), QueryStats()
+        token = current_query_stats.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_query_stats.reset(token)
+        self.observe(request, response, started, stats)
+        return response
+
+    async def __acall__(self, request):
+        started, stats = time.perf_counter(), QueryStats()
+        token = current_query_stats.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_query_stats.reset(token)
+        self.observe(request, response, started, stats)
+        return response
+
+
+def get_registry():
+    """ Реестр метрик процесса или всех воркеров gunicorn.
+
+        С PROMETHEUS_MULTIPROC_DIR метрики воркеров пишутся в файлы
+        каталога и собираются MultiProcessCollector.
+    """
+
+    if not os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def metrics_view(request):
+    """ Метрики в формате Prometheus по токену METRICS_TOKEN.
+
+        Токен передается заголовком Authorization: Bearer <токен>.
+        Без METRICS_TOKEN адрес не существует.
+    """
+
+    if not settings.METRICS_TOKEN:
+        raise Http404
+    scheme, _, token = request.META.get(
+        'HTTP_AUTHORIZATION', ''
+    ).partition(' ')
+    if scheme != 'Bearer' or not hmac.compare_digest(
+        token.encode(), settings.METRICS_TOKEN.encode()
+    ):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST
+    )
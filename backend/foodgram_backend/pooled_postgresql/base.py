@@ -0,0 +1,86 @@
+import threading
+
+import psycopg2.extras
+from django.conf import settings
+from django.db.backends.postgresql import base
+from psycopg2 import pool
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool(pool.ThreadedConnectionPool):
+    """ Пул соединений с ожиданием свободного соединения.
+
+        ThreadedConnectionPool при исчерпании сразу бросает
+        PoolError, здесь поток ждет до DB_POOL_TIMEOUT секунд.
+    """
+
+    def __init__(self, minconn, maxconn, *args, **kwargs):
+        self.slots = threading.BoundedSemaphore(maxconn)
+        super().__init__(minconn, maxconn, *args, **kwargs)
+
+    def getconn(self, key=None):
+        if not self.slots.acquire(timeout=settings.DB_POOL_TIMEOUT):
+            raise base.Database.OperationalError(
+                'Нет свободных соединений в пуле.'
+            )
+        try:
+            connection = super().getconn(key)
+            if connection.closed:
+                super().putconn(connection, close=True)
+                connection = super().getconn(key)
+        except Exception:
+            self.slots.release()
+            raise
+        return connection
+
+    def putconn(self, connection, key=None, close=False):
+        try:
+            super().putconn(connection, key, close or bool(connection.closed))
+        finally:
+            self.slots.release()
+
+
+def get_pool(alias, conn_params):
+    with _pools_lock:
+        if alias not in _pools:
+            _pools[alias] = ConnectionPool(
+                settings.DB_POOL_MIN_SIZE, settings.DB_POOL_MAX_SIZE,
+                **conn_params,
+            )
+        return _pools[alias]
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """ PostgreSQL с соединениями из пула процесса.
+
+        Закрытие соединения Django возвращает его в пул, поэтому
+        CONN_MAX_AGE должен быть 0. Нужен для ASGI, где запросы
+        обслуживаются разными потоками и постоянные соединения
+        Django не переиспользуются.
+    """
+
+    @base.async_unsafe
+    def get_new_connection(self, conn_params):
+        connection = get_pool(self.alias, conn_params).getconn()
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+        psycopg2.extras.register_default_jsonb(
+            conn_or_curs=connection, loads=lambda x: x
+        )
+        return connection
+
+    @base.async_unsafe
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                return get_pool(
+                    self.alias, self.get_connection_params()
+                ).putconn(self.connection)
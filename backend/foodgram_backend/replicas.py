@@ -0,0 +1,139 @@
+import asyncio
+import hashlib
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+
+from .metrics import record_cache
+
+PRIMARY = 'default'
+REPLICA_PREFIX = 'replica_'
+PIN_KEY_PREFIX = 'db-primary-pin:'
+# Приложения, которые всегда читаются из основной БД: токены сразу
+# после входа и таблица кеша с закреплениями за основной БД
+PRIMARY_ONLY_APPS = (
+    'authtoken',
+    'django_cache',
+)
+# POST запросы только на чтение
+READ_ONLY_POST_PATHS = (
+    '/api/batch/',
+)
+
+use_replicas = ContextVar('use_replicas', default=False)
+
+
+def replica_aliases():
+    return [
+        alias for alias in settings.DATABASES
+        if alias.startswith(REPLICA_PREFIX)
+    ]
+
+
+class ReplicaRouter:
+    """ Чтение с реплик в безопасных запросах, запись - в основную БД.
+
+        Реплики используются только внутри запросов, для которых
+        ReplicaRoutingMiddleware разрешил чтение с реплик. Фоновые
+        задачи и команды работают с основной БД. Токены и кеш всегда
+        читаются из основной БД: сразу после входа реплика может
+        не знать о новом токене.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (
+            not use_replicas.get()
+            or model._meta.app_label in PRIMARY_ONLY_APPS
+        ):
+            return PRIMARY
+        replicas = replica_aliases()
+        return random.choice(replicas) if replicas else PRIMARY
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == PRIMARY
+
+
+def primary_pin_key(request):
+    """ Ключ закрепления за основной БД по токену или сессии. """
+
+    credentials = request.META.get(
+        'HTTP_AUTHORIZATION'
+    ) or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not credentials:
+        return None
+    return PIN_KEY_PREFIX + hashlib.sha256(credentials.encode()).hexdigest()
+
+
+class ReplicaRoutingMiddleware:
+    """ Выбор БД для чтения на время запроса.
+
+        Безопасные запросы читают с реплик. После успешного
+        изменяющего запроса пользователь на DB_REPLICA_PIN_SECONDS
+        закрепляется за основной БД, чтобы видеть свои изменения,
+        пока реплики догоняют. Закрепления хранятся в общем для
+        процессов кеше CACHE_BACKEND.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Как в MiddlewareMixin: экземпляр вызывается как корутина
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def get_routing(self, request):
+        read_only = (
+            request.method in SAFE_METHODS
+            or request.path in READ_ONLY_POST_PATHS
+        )
+        pin_key = primary_pin_key(request)
+        pinned = False
+        if pin_key is not None:
+            pinned = cache.get(pin_key, False)
+            record_cache('replica_pin', pinned)
+        return read_only, pin_key, pinned
+
+    def pin(self, read_only, pin_key, response):
+        if (
+            not read_only and pin_key is not None
+            and response.status_code < 400
+        ):
+            cache.set(pin_key, True, settings.DB_REPLICA_PIN_SECONDS)
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        read_only, pin_key, pinned = self.get_routing(request)
+        token = use_replicas.set(read_only and not pinned)
+        try:
+            response = self.get_response(request)
+        finally:
+            use_replicas.reset(token)
+        self.pin(read_only, pin_key, response)
+        return response
+
+    async def __acall__(self, request):
+        read_only, pin_key, pinned = await sync_to_async(
+            self.get_routing, thread_sensitive=False
+        )(request)
+        token = use_replicas.set(read_only and not pinned)
+        try:
+            response = await self.get_response(request)
+        finally:
+            use_replicas.reset(token)
+        await sync_to_async(self.pin, thread_sensitive=False)(
+            read_only, pin_key, response
+        )
+        return response
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/3.2/ref/settings/
 import os
 
 from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,6 +42,80 @@ ING_MEASUREMENT_UNIT_MAX_LENGTH = 200
 RECIPE_NAME_MAX_LENGTH = 200
 RECIPE_MIN_VOL_VALIDATOR = 1
 RECIPE_MAX_VOL_VALIDATOR = 1500
+RECIPE_IMAGE_MAX_SIZE = int(
+    os.getenv('RECIPE_IMAGE_MAX_SIZE', 5 * 1024 * 1024)
+)
+RECIPE_IMAGE_MAX_DIMENSION = int(
+    os.getenv('RECIPE_IMAGE_MAX_DIMENSION', 4096)
+)
+RECIPE_IMAGE_RENDITION_WIDTHS = (320, 640)
+RECIPE_IMAGE_PLACEHOLDER_MAX_LENGTH = 64
+# Количество потоков генерации копий изображений, 0 - без фона
+RECIPE_IMAGE_WORKERS = int(os.getenv('RECIPE_IMAGE_WORKERS', 2))
+
+# Сборка JSON списка рецептов средствами PostgreSQL
+RECIPES_DB_JSON = os.getenv('RECIPES_DB_JSON', 'True') == 'True'
+# Максимум рецептов в запросе /api/recipes/?ids=
+RECIPES_IDS_MAX = 100
+# Наибольший id рецепта (BigAutoField)
+RECIPE_PK_MAX = 2 ** 63 - 1
+
+# Приблизительный count в пагинации списков
+PAGINATION_ESTIMATED_COUNTS = (
+    os.getenv('PAGINATION_ESTIMATED_COUNTS', 'True') == 'True'
+)
+# До скольких строк оценки таблицы count считается точно
+PAGINATION_ESTIMATE_THRESHOLD = 10000
+# Время кеширования count списков с фильтрами, секунды
+PAGINATION_COUNT_CACHE_SECONDS = int(
+    os.getenv('PAGINATION_COUNT_CACHE_SECONDS', 30)
+)
+
+# Лента подписок
+FEED_FANOUT_MAX_FOLLOWERS = int(
+    os.getenv('FEED_FANOUT_MAX_FOLLOWERS', 10000)
+)
+FEED_FANOUT_BATCH_SIZE = 1000
+FEED_BACKFILL_LIMIT = 50
+FEED_WORKERS = int(os.getenv('FEED_WORKERS', 2))
+
+# Похожие рецепты
+SIMILAR_RECIPES_COUNT = int(os.getenv('SIMILAR_RECIPES_COUNT', 20))
+SIMILAR_RECIPES_BATCH_SIZE = 512
+SIMILAR_RECIPES_TAG_WEIGHT = 0.5
+
+# Индекс ингредиентов для поиска по продуктам в наличии
+PANTRY_INDEX_SYNC_INTERVAL = int(os.getenv('PANTRY_INDEX_SYNC_INTERVAL', 60))
+PANTRY_INDEX_REBUILD_THRESHOLD = 100
+
+# Поиск дублей рецептов (MinHash/LSH)
+RECIPE_MINHASH_PERMUTATIONS = 100
+RECIPE_MINHASH_BANDS = 20
+RECIPE_DUPLICATE_THRESHOLD = float(
+    os.getenv('RECIPE_DUPLICATE_THRESHOLD', 0.7)
+)
+# off - не проверять, warn - предупреждение в ответе, block - ошибка
+RECIPE_DUPLICATES_MODE = os.getenv('RECIPE_DUPLICATES_MODE', 'warn')
+RECIPE_DUPLICATES_WORKERS = int(os.getenv('RECIPE_DUPLICATES_WORKERS', 1))
+
+# Итоги списков покупок
+CART_TOTALS_BATCH_SIZE = 1000
+
+# Синхронизация клиентов по журналу изменений
+SYNC_PAGE_SIZE = 500
+# Изменения моложе задержки не отдаются: их транзакции могут быть
+# еще не закоммичены, а id журнала выдаются раньше коммита
+SYNC_SAFETY_LAG = int(os.getenv('SYNC_SAFETY_LAG', 5))
+SYNC_RETENTION_DAYS = int(os.getenv('SYNC_RETENTION_DAYS', 30))
+
+# Максимум подзапросов в /api/batch/
+BATCH_MAX_REQUESTS = 10
+
+# Экспорт и импорт рецептов в NDJSON
+RECIPES_EXPORT_CHUNK_SIZE = 500
+RECIPES_IMPORT_BATCH_SIZE = 100
+RECIPES_IMPORT_MAX_LINES = 10000
+RECIPES_IMPORT_MAX_ERRORS = 100
 
 # Константы модели RecipeIngredient
 RECIPE_ING_MIN_VOL_VALIDATOR = 1
@@ -85,7 +160,9 @@ INSTALLED_APPS = [
 
 
 MIDDLEWARE = [
+    'foodgram_backend.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'foodgram_backend.replicas.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -114,6 +191,15 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'foodgram_backend.wsgi.application'
 
+# Асинхронные обертки горячих представлений, включаются в asgi.py
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'False') == 'True'
+# Потоков для ORM асинхронных представлений на процесс
+ASYNC_VIEWS_THREADS = int(os.getenv('ASYNC_VIEWS_THREADS', 10))
+# Прогрев воркера gunicorn до первого запроса
+WORKER_WARMUP = os.getenv('WORKER_WARMUP', 'True') == 'True'
+# Токен для /metrics, без токена метрики не отдаются
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
 
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
@@ -132,9 +218,62 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', 'django'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', ''),
-        'PORT': os.getenv('DB_PORT', 5432)
+        'PORT': os.getenv('DB_PORT', 5432),
+        # Постоянные соединения: секунды жизни, 0 - новое на запрос
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        # pgbouncer в режиме transaction не поддерживает курсоры сервера
+        'DISABLE_SERVER_SIDE_CURSORS': (
+            os.getenv('DB_PGBOUNCER', 'False') == 'True'
+        ),
     }
 }
+# Проверка постоянных соединений SELECT 1 в начале запроса
+DB_HEALTH_CHECKS = os.getenv('DB_HEALTH_CHECKS', 'True') == 'True'
+# Пул соединений процесса (для ASGI), 0 - без пула
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', 0))
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', 1))
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 10))
+if DB_POOL_MAX_SIZE:
+    DATABASES['default'].update(
+        ENGINE='foodgram_backend.pooled_postgresql',
+        CONN_MAX_AGE=0,
+    )
+
+# Реплики для чтения: DB_REPLICAS=host1,host2:5433 с учетными данными
+# основной БД
+DB_REPLICAS = [
+    replica for replica in os.getenv('DB_REPLICAS', '').split(',') if replica
+]
+for number, replica in enumerate(DB_REPLICAS, 1):
+    host, _, port = replica.partition(':')
+    DATABASES[f'replica_{number}'] = dict(
+        DATABASES['default'],
+        HOST=host,
+        PORT=port or DATABASES['default']['PORT'],
+        TEST={'MIRROR': 'default'},
+    )
+DATABASE_ROUTERS = ('foodgram_backend.replicas.ReplicaRouter',)
+# Сколько секунд после изменения пользователь читает из основной БД
+DB_REPLICA_PIN_SECONDS = int(os.getenv('DB_REPLICA_PIN_SECONDS', 10))
+
+# Кеш общий для всех воркеров: с репликами по умолчанию таблица в
+# основной БД (manage.py createcachetable), можно указать memcached
+CACHE_BACKEND = os.getenv('CACHE_BACKEND') or (
+    'django.core.cache.backends.db.DatabaseCache' if DB_REPLICAS
+    else 'django.core.cache.backends.locmem.LocMemCache'
+)
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.getenv('CACHE_LOCATION', 'django_cache'),
+    },
+}
+if DB_REPLICAS and CACHE_BACKEND.endswith('.LocMemCache'):
+    # Закрепление за основной БД в памяти одного процесса не видят
+    # другие воркеры, и пользователь не видит своих изменений
+    raise ImproperlyConfigured(
+        'Для DB_REPLICAS нужен общий для процессов CACHE_BACKEND.'
+    )
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -178,6 +317,18 @@ STATIC_ROOT = BASE_DIR / 'static'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Файлы именуются по sha256 содержимого, для S3 -
+# recipes.storage.ContentAddressedS3Storage (нужен django-storages)
+DEFAULT_FILE_STORAGE = os.getenv(
+    'DEFAULT_FILE_STORAGE',
+    'recipes.storage.ContentAddressedFileSystemStorage',
+)
+
+# Загружаемые файлы пишутся на диск, а не в память
+FILE_UPLOAD_HANDLERS = (
+    'api.uploadhandlers.LimitedTemporaryFileUploadHandler',
+)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -189,6 +340,15 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'api.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
     'DEFAULT_PAGINATION_CLASS': 'api.pagination.LimitPagination',
     'PAGE_SIZE': 6,
 }
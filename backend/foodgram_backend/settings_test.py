@@ -0,0 +1,16 @@
+from .settings import *  # noqa: F401, F403
+from .settings import BASE_DIR, DATABASES, os
+
+# TEST_DB=postgresql - тесты на PostgreSQL из переменных DB_*,
+# иначе на SQLite
+if os.getenv('TEST_DB', 'sqlite') != 'postgresql':
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'test.sqlite3',
+    }
+# Реплика для тестов маршрутизации чтения (маркер replicas)
+DATABASES['replica_1'] = {
+    'ENGINE': 'django.db.backends.sqlite3',
+    'NAME': BASE_DIR / 'test_replica.sqlite3',
+}
+PASSWORD_HASHERS = ('django.contrib.auth.hashers.MD5PasswordHasher',)
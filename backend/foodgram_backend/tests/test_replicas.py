@@ -0,0 +1,154 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import AsyncClient
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from foodgram_backend.replicas import ReplicaRouter, use_replicas
+from recipes.models import Tag
+from users.models import Subscription
+
+REPLICA = 'replica_1'
+
+pytestmark = [
+    pytest.mark.replicas,
+    pytest.mark.django_db(databases=['default', REPLICA], transaction=True),
+]
+
+
+@pytest.fixture(autouse=True)
+def replica_tags(monkeypatch):
+    """ Разные теги в основной БД и реплике показывают, откуда чтение. """
+
+    # Подписка без фоновых потоков
+    monkeypatch.setattr('recipes.signals.FEED_WORKERS', 0)
+    cache.clear()
+    with connections[REPLICA].schema_editor() as editor:
+        editor.create_model(Tag)
+    Tag.objects.using('default').create(
+        name='primary', color='#000001', slug='primary',
+    )
+    Tag.objects.using(REPLICA).create(
+        name='replica', color='#000002', slug='replica',
+    )
+    yield
+    with connections[REPLICA].schema_editor() as editor:
+        editor.delete_model(Tag)
+
+
+@pytest.fixture
+def users(make_user):
+    return [make_user() for _ in range(2)]
+
+
+def token_client(user):
+    client = APIClient()
+    token = Token.objects.create(user=user)
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+def tag_names(client):
+    response = client.get('/api/tags/')
+    assert response.status_code == 200, response.content
+    return [tag['name'] for tag in response.json()]
+
+
+def test_safe_reads_use_replica():
+    assert tag_names(APIClient()) == ['replica']
+
+
+def test_token_read_from_primary(users):
+    # В реплике нет таблицы токенов: чтение токена с реплики упало бы
+    assert tag_names(token_client(users[0])) == ['replica']
+
+
+def test_write_goes_to_primary_and_pins_user(users):
+    user, author = users
+    client = token_client(user)
+    assert tag_names(client) == ['replica']
+
+    response = client.post(f'/api/users/{author.id}/subscribe/')
+
+    assert response.status_code == 201, response.content
+    assert Subscription.objects.using('default').filter(
+        user=user, author=author
+    ).exists()
+    assert tag_names(client) == ['primary']
+    assert tag_names(token_client(author)) == ['replica']
+    assert tag_names(APIClient()) == ['replica']
+
+
+def test_failed_write_does_not_pin(users):
+    user, _ = users
+    client = token_client(user)
+
+    response = client.post(f'/api/users/{user.id}/subscribe/')
+
+    assert response.status_code == 400, response.content
+    assert tag_names(client) == ['replica']
+
+
+def test_pin_in_database_cache_on_primary(users, settings):
+    settings.CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'django_cache',
+        },
+    }
+    # Таблица кеша есть только в основной БД
+    call_command('createcachetable', database='default')
+    user, author = users
+    client = token_client(user)
+
+    response = client.post(f'/api/users/{author.id}/subscribe/')
+
+    assert response.status_code == 201, response.content
+    assert tag_names(client) == ['primary']
+
+
+def test_router_reads_replica_only_inside_routed_request():
+    router = ReplicaRouter()
+
+    assert router.db_for_read(Tag) == 'default'
+    token = use_replicas.set(True)
+    try:
+        assert router.db_for_read(Tag) == REPLICA
+        assert router.db_for_read(Token) == 'default'
+        assert router.db_for_write(Tag) == 'default'
+    finally:
+        use_replicas.reset(token)
+
+
+def test_pin_expires(users, settings):
+    settings.DB_REPLICA_PIN_SECONDS = 0
+    user, author = users
+    client = token_client(user)
+
+    response = client.post(f'/api/users/{author.id}/subscribe/')
+
+    assert response.status_code == 201, response.content
+    assert tag_names(client) == ['replica']
+
+
+def test_async_read_after_write_goes_to_primary(users):
+    user, author = users
+    token = Token.objects.create(user=user)
+    # AsyncClient передает заголовки ASGI в нижнем регистре
+    headers = {'authorization': f'Token {token.key}'}
+
+    @async_to_sync
+    async def subscribe_and_read():
+        client = AsyncClient()
+        response = await client.post(
+            f'/api/users/{author.id}/subscribe/', **headers
+        )
+        assert response.status_code == 201, response.content
+        return await client.get('/api/tags/', **headers)
+
+    response = subscribe_and_read()
+
+    assert [tag['name'] for tag in response.json()] == ['primary']
@@ -0,0 +1,41 @@
+import logging
+import time
+
+from django.db import DatabaseError, connections
+from django.urls import reverse
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up():
+    """ Прогрев процесса до первого запроса.
+
+        Заполняет url резолвер, кеши _meta моделей через построение
+        полей сериализаторов, регистрирует шрифт PDF и строит индекс
+        ингредиентов и тегов. Ошибка БД не мешает запуску: индекс
+        построится при первом поиске. Соединения с БД закрываются,
+        чтобы не передать их процессам после fork.
+    """
+
+    from api.serializers import (
+        CustomUserSerializer, IngredientSerializer, RecipeSerializer,
+        SubscriptionSerializer, TagSerializer,
+    )
+    from api.utils import register_pdf_font
+    from recipes.pantry import pantry_index
+
+    started = time.monotonic()
+    reverse('api:recipes-list')
+    for serializer in (
+        RecipeSerializer, TagSerializer, IngredientSerializer,
+        CustomUserSerializer, SubscriptionSerializer,
+    ):
+        serializer().fields
+    register_pdf_font()
+    try:
+        pantry_index.sync()
+    except DatabaseError:
+        logger.warning('Индекс ингредиентов не построен при прогреве')
+    finally:
+        connections.close_all()
+    logger.info('Прогрев за %.3f с', time.monotonic() - started)
@@ -0,0 +1,37 @@
+import os
+import shutil
+
+# Общий каталог метрик воркеров, задается до импорта prometheus_client.
+# Метрики прошлого запуска удаляются при чтении конфигурации: с
+# GUNICORN_PRELOAD приложение импортируется раньше on_starting
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/foodgram-metrics')
+shutil.rmtree(os.environ['PROMETHEUS_MULTIPROC_DIR'], ignore_errors=True)
+os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'])
+
+bind = '0.0.0.0:8000'
+workers = int(os.getenv('GUNICORN_WORKERS', 1))
+# Импорт приложения в мастере до fork, воркеры делят память модулей
+preload_app = os.getenv('GUNICORN_PRELOAD', 'False') == 'True'
+
+# SERVER_MODE=asgi - uvicorn воркеры и асинхронные представления
+if os.getenv('SERVER_MODE', 'wsgi') == 'asgi':
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    wsgi_app = 'foodgram_backend.asgi:application'
+else:
+    wsgi_app = 'foodgram_backend.wsgi:application'
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def post_worker_init(worker):
+    """ Прогрев воркера после загрузки приложения. """
+
+    from django.conf import settings
+
+    if settings.WORKER_WARMUP:
+        from foodgram_backend.warmup import warm_up
+        warm_up()
@@ -1,8 +1,11 @@
 from django.contrib import admin
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 
 from foodgram_backend.settings import EMPTY_VALUE
-from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, Tag)
+from recipes.cart import recipe_ingredients, recipe_ingredients_changed
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeDuplicate,
+                            RecipeIngredient, ShoppingCart, Tag)
 
 
 @admin.register(Tag)
@@ -25,13 +28,20 @@ class IngredientAdmin(admin.ModelAdmin):
         'name',
     )
     list_filter = (
-        'name',
+        'measurement_unit',
+    )
+    ordering = (
+        'name', 'measurement_unit',
     )
+    show_full_result_count = False
     empty_value_display = EMPTY_VALUE
 
 
 class RecipeIngredientsInLine(admin.TabularInline):
     model = Recipe.ingredients.through
+    autocomplete_fields = (
+        'ingredient',
+    )
     extra = 1
     min_num = 1
 
@@ -47,41 +57,107 @@ class RecipeAdmin(admin.ModelAdmin):
     list_display = (
         'id', 'name', 'author', 'favorites_amount',
     )
+    list_select_related = (
+        'author',
+    )
     exclude = (
         'tags',
     )
+    autocomplete_fields = (
+        'author',
+    )
     search_fields = (
-        'name', 'author'
+        'name', 'author__username',
     )
     list_filter = (
-        'author', 'name', 'tags',
+        'tags',
     )
     inlines = (
         RecipeIngredientsInLine,
         RecipeTagsInLine,
     )
+    show_full_result_count = False
     empty_value_display = EMPTY_VALUE
 
+    def get_queryset(self, request):
+        """ Число добавлений в избранное подзапросом для каждой строки.
+
+            В отличие от Count с JOIN подзапрос считается только для
+            рецептов страницы, а не группирует всю таблицу.
+        """
+
+        return super().get_queryset(request).annotate(
+            favorites_count=Coalesce(
+                Subquery(
+                    Favorite.objects.filter(
+                        recipe=OuterRef('pk')
+                    ).order_by().values('recipe').annotate(
+                        count=Count('pk')
+                    ).values('count'),
+                    output_field=IntegerField(),
+                ),
+                0,
+            )
+        )
+
+    @admin.display(
+        description='В избранном', ordering='favorites_count'
+    )
     def favorites_amount(self, obj):
-        return obj.favorite.count()
+        return obj.favorites_count
+
+    def save_related(self, request, form, formsets, change):
+        """ Перенос изменения ингредиентов в итоги списков покупок. """
+
+        old_ingredients = recipe_ingredients(form.instance.pk)
+        super().save_related(request, form, formsets, change)
+        recipe_ingredients_changed(form.instance.pk, old_ingredients)
 
 
 @admin.register(RecipeIngredient)
 class RecipeIngredientAdmin(admin.ModelAdmin):
+    """ Ингредиенты рецептов только для просмотра.
+
+        Изменения ингредиентов переносятся в итоги списков покупок
+        (CartTotal) пачкой на рецепт в RecipeAdmin.save_related и
+        сериализаторе рецепта, поэтому ингредиенты меняются только
+        вместе с рецептом.
+    """
+
     list_display = (
         'id', 'recipe', 'ingredient', 'amount'
     )
+    list_select_related = (
+        'recipe', 'ingredient',
+    )
+    show_full_result_count = False
     empty_value_display = EMPTY_VALUE
 
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
 
 @admin.register(Favorite)
 class FavoriteAdmin(admin.ModelAdmin):
     list_display = (
         'id', 'user', 'recipe'
     )
+    list_select_related = (
+        'user', 'recipe',
+    )
+    autocomplete_fields = (
+        'user', 'recipe',
+    )
     search_fields = (
-        'user', 'recipe'
+        'user__username', 'recipe__name',
     )
+    show_full_result_count = False
     empty_value_display = EMPTY_VALUE
 
 
@@ -90,7 +166,34 @@ class ShoppingCartAdmin(admin.ModelAdmin):
     list_display = (
         'id', 'user', 'recipe'
     )
+    list_select_related = (
+        'user', 'recipe',
+    )
+    autocomplete_fields = (
+        'user', 'recipe',
+    )
     search_fields = (
-        'user', 'recipe'
+        'user__username', 'recipe__name',
+    )
+    show_full_result_count = False
+    empty_value_display = EMPTY_VALUE
+
+
+@admin.register(RecipeDuplicate)
+class RecipeDuplicateAdmin(admin.ModelAdmin):
+    """ Отчет о вероятных дублях рецептов. """
+
+    list_display = (
+        'id', 'recipe', 'duplicate', 'similarity',
+    )
+    list_select_related = (
+        'recipe', 'duplicate',
+    )
+    raw_id_fields = (
+        'recipe', 'duplicate',
+    )
+    ordering = (
+        '-similarity', '-recipe',
     )
+    show_full_result_count = False
     empty_value_display = EMPTY_VALUE
@@ -0,0 +1,57 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def get_executor(name, workers):
+    """ Общий для процесса пул потоков с именем name. """
+
+    with _executors_lock:
+        if name not in _executors:
+            _executors[name] = ThreadPoolExecutor(
+                max_workers=workers,
+                thread_name_prefix=name,
+            )
+        return _executors[name]
+
+
+def call_logged(func, *args):
+    """ Вызов задачи с логированием ошибок. """
+
+    try:
+        func(*args)
+    except Exception:
+        logger.exception('Ошибка фоновой задачи %s%s', func.__name__, args)
+
+
+def call_in_thread(func, *args):
+    """ Вызов задачи в потоке пула: соединения потока с БД закрываются. """
+
+    try:
+        call_logged(func, *args)
+    finally:
+        connections.close_all()
+
+
+def run_on_commit(name, workers, func, *args):
+    """ Запуск задачи в пуле name после коммита текущей транзакции.
+
+        При workers == 0 задача выполняется сразу после коммита в
+        текущем потоке.
+    """
+
+    if workers:
+        transaction.on_commit(
+            lambda: get_executor(name, workers).submit(
+                call_in_thread, func, *args
+            )
+        )
+    else:
+        transaction.on_commit(lambda: call_logged(func, *args))
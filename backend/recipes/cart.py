@@ -0,0 +1,130 @@
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from foodgram_backend.settings import CART_TOTALS_BATCH_SIZE
+from recipes.models import CartTotal, RecipeIngredient, ShoppingCart
+from users.models import User
+
+
+def recipe_ingredients(recipe_id):
+    """ Словарь {id ингредиента: количество} рецепта. """
+
+    return dict(
+        RecipeIngredient.objects.filter(recipe=recipe_id).values(
+            'ingredient'
+        ).annotate(total=Sum('amount')).values_list(
+            'ingredient', 'total'
+        ).order_by()
+    )
+
+
+def ingredients_delta(old, new):
+    """ Приращения {id ингредиента: (количество, рецептов)}. """
+
+    delta = {}
+    for ingredient_id in old.keys() | new.keys():
+        amount = new.get(ingredient_id, 0) - old.get(ingredient_id, 0)
+        recipes = (ingredient_id in new) - (ingredient_id in old)
+        if amount or recipes:
+            delta[ingredient_id] = (amount, recipes)
+    return delta
+
+
+def apply_delta(user_ids, delta):
+    """ Применение приращений к итогам списков покупок пользователей.
+
+        Строки пользователей блокируются, чтобы параллельные
+        изменения одного списка не создали итог дважды. Итог
+        удаляется, когда ингредиент не остается ни в одном рецепте.
+    """
+
+    if not delta or not user_ids:
+        return
+    with transaction.atomic():
+        list(User.objects.select_for_update().filter(
+            pk__in=user_ids
+        ).order_by('pk').values_list('pk', flat=True))
+        totals = {
+            (total.user_id, total.ingredient_id): total
+            for total in CartTotal.objects.filter(
+                user__in=user_ids, ingredient__in=delta
+            )
+        }
+        updated, created, deleted = [], [], []
+        for user_id in user_ids:
+            for ingredient_id, (amount, recipes) in delta.items():
+                total = totals.get((user_id, ingredient_id))
+                if total is None:
+                    if recipes > 0:
+                        created.append(CartTotal(
+                            user_id=user_id, ingredient_id=ingredient_id,
+                            amount=amount, recipes=recipes,
+                        ))
+                    continue
+                total.amount += amount
+                total.recipes += recipes
+                if total.recipes > 0:
+                    updated.append(total)
+                else:
+                    deleted.append(total.pk)
+        CartTotal.objects.bulk_update(updated, ('amount', 'recipes'))
+        CartTotal.objects.bulk_create(created)
+        CartTotal.objects.filter(pk__in=deleted).delete()
+
+
+def add_to_cart_totals(user_id, recipe_id):
+    delta = ingredients_delta({}, recipe_ingredients(recipe_id))
+    apply_delta([user_id], delta)
+
+
+def remove_from_cart_totals(user_id, recipe_id):
+    delta = ingredients_delta(recipe_ingredients(recipe_id), {})
+    apply_delta([user_id], delta)
+
+
+def recipe_ingredients_changed(recipe_id, old):
+    """ Перенос изменения ингредиентов рецепта в итоги списков покупок.
+
+        old - ингредиенты рецепта до изменения из recipe_ingredients.
+        Приращение применяется пачками пользователей, у которых
+        рецепт в списке покупок.
+    """
+
+    delta = ingredients_delta(old, recipe_ingredients(recipe_id))
+    if not delta:
+        return
+    users = ShoppingCart.objects.filter(recipe=recipe_id).values_list(
+        'user', flat=True
+    ).order_by('user').iterator(chunk_size=CART_TOTALS_BATCH_SIZE)
+    while True:
+        batch = list(islice(users, CART_TOTALS_BATCH_SIZE))
+        if not batch:
+            break
+        apply_delta(batch, delta)
+
+
+def rebuild_cart_totals():
+    """ Полный пересчет итогов списков покупок из RecipeIngredient. """
+
+    totals = RecipeIngredient.objects.filter(
+        recipe__shopping_list__isnull=False
+    ).values('recipe__shopping_list__user', 'ingredient').annotate(
+        total=Sum('amount'), recipes_count=Count('recipe', distinct=True)
+    ).values_list(
+        'recipe__shopping_list__user', 'ingredient', 'total',
+        'recipes_count',
+    ).order_by()
+    with transaction.atomic():
+        CartTotal.objects.all().delete()
+        CartTotal.objects.bulk_create(
+            (
+                CartTotal(
+                    user_id=user_id, ingredient_id=ingredient_id,
+                    amount=amount, recipes=recipes,
+                )
+                for user_id, ingredient_id, amount, recipes in totals
+            ),
+            batch_size=CART_TOTALS_BATCH_SIZE,
+        )
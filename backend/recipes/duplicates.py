@@ -0,0 +1,158 @@
+import hashlib
+import random
+import re
+from array import array
+
+from django.db import transaction
+from django.db.models import Q
+
+from foodgram_backend.settings import (
+    RECIPE_DUPLICATE_THRESHOLD,
+    RECIPE_MINHASH_BANDS,
+    RECIPE_MINHASH_PERMUTATIONS,
+)
+from recipes.models import (
+    Recipe, RecipeBucket, RecipeDuplicate, RecipeSignature,
+)
+
+MERSENNE_PRIME = (1 << 61) - 1
+SHINGLE_SIZE = 3
+BAND_ROWS = RECIPE_MINHASH_PERMUTATIONS // RECIPE_MINHASH_BANDS
+
+_random = random.Random(RECIPE_MINHASH_PERMUTATIONS)
+PERMUTATIONS = tuple(
+    (
+        _random.randrange(1, MERSENNE_PRIME),
+        _random.randrange(0, MERSENNE_PRIME),
+    )
+    for _ in range(RECIPE_MINHASH_PERMUTATIONS)
+)
+
+
+def hash64(value):
+    return int.from_bytes(
+        hashlib.blake2b(value.encode(), digest_size=8).digest(), 'big'
+    )
+
+
+def recipe_tokens(ingredient_ids, name, text):
+    """ Признаки рецепта: id ингредиентов и шинглы слов текста.
+
+        Текст приводится к нижнему регистру и разбивается на слова,
+        шингл - SHINGLE_SIZE подряд идущих слов названия и описания.
+    """
+
+    tokens = {f'i:{ingredient_id}' for ingredient_id in ingredient_ids}
+    words = re.findall(r'\w+', f'{name} {text}'.lower())
+    tokens.update(
+        't:' + ' '.join(words[start:start + SHINGLE_SIZE])
+        for start in range(max(len(words) - SHINGLE_SIZE + 1, 1))
+        if words
+    )
+    return tokens
+
+
+def minhash(tokens):
+    """ MinHash подпись набора признаков, None для пустого набора. """
+
+    if not tokens:
+        return None
+    hashes = [hash64(token) for token in tokens]
+    return array('Q', (
+        min((a * value + b) % MERSENNE_PRIME for value in hashes)
+        for a, b in PERMUTATIONS
+    ))
+
+
+def band_buckets(signature):
+    """ Корзины LSH: хеш номера полосы и ее значений. """
+
+    buckets = []
+    for band in range(RECIPE_MINHASH_BANDS):
+        rows = signature[band * BAND_ROWS:(band + 1) * BAND_ROWS]
+        digest = hashlib.blake2b(
+            band.to_bytes(2, 'big') + rows.tobytes(), digest_size=8
+        ).digest()
+        buckets.append(int.from_bytes(digest, 'big', signed=True))
+    return buckets
+
+
+def similarity(signature, other):
+    """ Оценка коэффициента Жаккара по совпадениям подписей. """
+
+    return sum(
+        1 for value, other_value in zip(signature, other)
+        if value == other_value
+    ) / len(signature)
+
+
+def load_signature(data):
+    signature = array('Q')
+    signature.frombytes(bytes(data))
+    return signature
+
+
+def find_duplicates(signature, exclude=None):
+    """ Вероятные дубли по подписи: список (id рецепта, сходство).
+
+        Кандидаты - рецепты хотя бы с одной общей корзиной, они
+        выбираются по индексу, поэтому поиск не зависит от размера
+        каталога. Оценка сходства считается только для кандидатов.
+    """
+
+    if signature is None:
+        return []
+    candidates = RecipeBucket.objects.filter(
+        bucket__in=band_buckets(signature)
+    ).values('recipe').distinct()
+    if exclude is not None:
+        candidates = candidates.exclude(recipe=exclude)
+    duplicates = []
+    for recipe_id, data in RecipeSignature.objects.filter(
+        recipe__in=candidates
+    ).values_list('recipe', 'minhash'):
+        score = similarity(signature, load_signature(data))
+        if score >= RECIPE_DUPLICATE_THRESHOLD:
+            duplicates.append((recipe_id, score))
+    return sorted(duplicates, key=lambda item: (-item[1], item[0]))
+
+
+def recipe_signature(recipe):
+    return minhash(recipe_tokens(
+        recipe.recipe_ingredients.values_list('ingredient_id', flat=True),
+        recipe.name,
+        recipe.text,
+    ))
+
+
+def index_recipe(recipe_id):
+    """ Пересчет подписи, корзин и найденных дублей рецепта. """
+
+    recipe = Recipe.objects.filter(pk=recipe_id).only('name', 'text').first()
+    if recipe is None:
+        return
+    signature = recipe_signature(recipe)
+    duplicates = find_duplicates(signature, exclude=recipe_id)
+    with transaction.atomic():
+        RecipeBucket.objects.filter(recipe=recipe_id).delete()
+        RecipeDuplicate.objects.filter(
+            Q(recipe=recipe_id) | Q(duplicate=recipe_id)
+        ).delete()
+        if signature is None:
+            RecipeSignature.objects.filter(recipe=recipe_id).delete()
+            return
+        RecipeSignature.objects.update_or_create(
+            recipe_id=recipe_id,
+            defaults={'minhash': signature.tobytes()},
+        )
+        RecipeBucket.objects.bulk_create(
+            RecipeBucket(recipe_id=recipe_id, bucket=bucket)
+            for bucket in set(band_buckets(signature))
+        )
+        RecipeDuplicate.objects.bulk_create(
+            RecipeDuplicate(
+                recipe_id=recipe_id, duplicate_id=duplicate_id,
+                similarity=score,
+            )
+            for duplicate_id, score in duplicates
+        )
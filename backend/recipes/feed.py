@@ -0,0 +1,128 @@
+import heapq
+from itertools import islice
+
+from django.db.models import Q
+
+from foodgram_backend.settings import (
+    FEED_BACKFILL_LIMIT,
+    FEED_FANOUT_BATCH_SIZE,
+    FEED_FANOUT_MAX_FOLLOWERS,
+)
+from recipes.models import FeedItem, PopularAuthor, Recipe
+from users.models import Subscription
+
+
+def is_popular_author(author_id):
+    """ Проверка автора на рассылку ленты при чтении.
+
+        Автор, у которого подписчиков больше FEED_FANOUT_MAX_FOLLOWERS,
+        запоминается как популярный.
+    """
+
+    if PopularAuthor.objects.filter(author=author_id).exists():
+        return True
+    followers = Subscription.objects.filter(author=author_id)
+    if followers[FEED_FANOUT_MAX_FOLLOWERS:].exists():
+        PopularAuthor.objects.get_or_create(author_id=author_id)
+        return True
+    return False
+
+
+def fan_out_recipe(recipe_id):
+    """ Запись опубликованного рецепта в ленты подписчиков автора. """
+
+    recipe = Recipe.objects.filter(pk=recipe_id).only(
+        'author', 'pub_date'
+    ).first()
+    if recipe is None or is_popular_author(recipe.author_id):
+        return
+    followers = Subscription.objects.filter(
+        author=recipe.author_id
+    ).values_list('user_id', flat=True).iterator(
+        chunk_size=FEED_FANOUT_BATCH_SIZE
+    )
+    while True:
+        batch = list(islice(followers, FEED_FANOUT_BATCH_SIZE))
+        if not batch:
+            break
+        FeedItem.objects.bulk_create(
+            (
+                FeedItem(
+                    user_id=user_id,
+                    recipe_id=recipe.id,
+                    author_id=recipe.author_id,
+                    pub_date=recipe.pub_date,
+                )
+                for user_id in batch
+            ),
+            ignore_conflicts=True,
+        )
+
+
+def backfill_feed(user_id, author_id):
+    """ Последние рецепты автора в ленту нового подписчика. """
+
+    if is_popular_author(author_id):
+        return
+    recipes = Recipe.objects.filter(author=author_id).order_by(
+        '-pub_date'
+    ).values_list('id', 'pub_date')[:FEED_BACKFILL_LIMIT]
+    FeedItem.objects.bulk_create(
+        (
+            FeedItem(
+                user_id=user_id,
+                recipe_id=recipe_id,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for recipe_id, pub_date in recipes
+        ),
+        ignore_conflicts=True,
+    )
+
+
+def clear_feed(user_id, author_id):
+    """ Удаление рецептов автора из ленты отписавшегося пользователя. """
+
+    FeedItem.objects.filter(user=user_id, author=author_id).delete()
+
+
+def get_feed_page(user, limit, cursor=None):
+    """ Страница ленты: список пар (pub_date, id рецепта).
+
+        Записи ленты пользователя сливаются с рецептами популярных
+        авторов из его подписок. Обе выборки идут по индексу от
+        курсора (pub_date, id) в обратном порядке, берется limit + 1
+        записей, чтобы узнать о наличии следующей страницы.
+    """
+
+    timeline = FeedItem.objects.filter(user=user)
+    popular = Recipe.objects.filter(
+        author__in=PopularAuthor.objects.filter(
+            author__followings__user=user
+        ).values('author')
+    )
+    if cursor is not None:
+        pub_date, recipe_id = cursor
+        timeline = timeline.filter(
+            Q(pub_date__lt=pub_date)
+            | Q(pub_date=pub_date, recipe__lt=recipe_id)
+        )
+        popular = popular.filter(
+            Q(pub_date__lt=pub_date)
+            | Q(pub_date=pub_date, id__lt=recipe_id)
+        )
+    timeline = timeline.order_by('-pub_date', '-recipe').values_list(
+        'pub_date', 'recipe'
+    )[:limit + 1]
+    popular = popular.order_by('-pub_date', '-id').values_list(
+        'pub_date', 'id'
+    )[:limit + 1]
+    page = []
+    for item in heapq.merge(timeline, popular, reverse=True):
+        if page and page[-1] == item:
+            continue
+        page.append(item)
+        if len(page) > limit:
+            break
+    return page
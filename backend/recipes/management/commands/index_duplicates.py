@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from recipes.duplicates import index_recipe
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Расчет MinHash подписей и поиск дублей рецептов!'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Пересчитать подписи всех рецептов',
+        )
+
+    def handle(self, *args, **options):
+        print('Поиск рецептов без подписи ...')
+        recipes = Recipe.objects.order_by('id')
+        if not options['force']:
+            recipes = recipes.filter(signature__isnull=True)
+        recipe_ids = list(recipes.values_list('id', flat=True))
+        print(f'Рецептов для обработки: {len(recipe_ids)}')
+        for recipe_id in recipe_ids:
+            index_recipe(recipe_id)
+        print('Поиск дублей завершен!!!')
@@ -0,0 +1,39 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from recipes.background import call_in_thread
+from recipes.models import Recipe
+from recipes.renditions import make_renditions, renditions_outdated
+
+
+class Command(BaseCommand):
+    help = 'Генерация уменьшенных копий изображений рецептов!'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Количество потоков обработки',
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Обработать все изображения заново',
+        )
+
+    def handle(self, *args, **options):
+        print('Поиск изображений без копий ...')
+        recipes = Recipe.objects.exclude(image='').only(
+            'id', 'image', 'image_renditions'
+        )
+        recipe_ids = [
+            recipe.id for recipe in recipes.iterator()
+            if options['force'] or renditions_outdated(recipe)
+        ]
+        print(f'Изображений для обработки: {len(recipe_ids)}')
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            for recipe_id in recipe_ids:
+                executor.submit(
+                    call_in_thread, make_renditions, recipe_id,
+                    options['force'],
+                )
+        print('Генерация копий изображений завершена!!!')
@@ -0,0 +1,20 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from foodgram_backend.settings import SYNC_RETENTION_DAYS
+from recipes.models import SyncChange
+
+
+class Command(BaseCommand):
+    help = 'Удаление старых записей журнала синхронизации!'
+
+    def handle(self, *args, **options):
+        print('Очистка журнала синхронизации ...')
+        deleted, _ = SyncChange.objects.filter(
+            changed_at__lt=timezone.now() - timedelta(
+                days=SYNC_RETENTION_DAYS
+            )
+        ).delete()
+        print(f'Удалено записей: {deleted}')
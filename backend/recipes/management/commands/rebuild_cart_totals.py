@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from recipes.cart import rebuild_cart_totals
+from recipes.models import CartTotal
+
+
+class Command(BaseCommand):
+    help = 'Полный пересчет итогов списков покупок!'
+
+    def handle(self, *args, **options):
+        print('Пересчет итогов списков покупок ...')
+        rebuild_cart_totals()
+        print(f'Строк итогов: {CartTotal.objects.count()}')
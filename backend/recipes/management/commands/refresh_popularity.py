@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from recipes.popularity import refresh_hourly_stats, refresh_popularity
+
+
+class Command(BaseCommand):
+    help = 'Обновление почасовой статистики популярности рецептов!'
+
+    def handle(self, *args, **options):
+        print('Обновление статистики ...')
+        updated = refresh_hourly_stats()
+        print(f'Обновлено строк статистики: {updated}')
+        updated = refresh_popularity()
+        print(f'Обновлен рейтинг рецептов: {updated}')
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from recipes.similarity import refresh_similar
+
+
+class Command(BaseCommand):
+    help = 'Пересчет похожих рецептов по ингредиентам и тегам!'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Пересчитать все рецепты заново',
+        )
+
+    def handle(self, *args, **options):
+        print('Пересчет похожих рецептов ...')
+        updated = refresh_similar(full=options['full'])
+        print(f'Пересчитано рецептов: {updated}')
@@ -0,0 +1,50 @@
+# Generated by Django 3.2.3 on 2026-10-19 15:08
+
+import datetime
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Существующие записи получают старую дату, чтобы первый пересчет
+# статистики не посчитал их добавлениями за последние часы
+ADDED_AT_BACKFILL = datetime.datetime(2000, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='favorite',
+            name='added_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=ADDED_AT_BACKFILL, verbose_name='Добавлен в избранное'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='shoppingcart',
+            name='added_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=ADDED_AT_BACKFILL, verbose_name='Добавлен в список покупок'),
+            preserve_default=False,
+        ),
+        migrations.CreateModel(
+            name='RecipeHourlyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField(db_index=True, verbose_name='Час')),
+                ('favorites', models.PositiveIntegerField(default=0, verbose_name='Добавлений в избранное')),
+                ('carts', models.PositiveIntegerField(default=0, verbose_name='Добавлений в список покупок')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hourly_stats', to='recipes.recipe', verbose_name='Рецепт')),
+            ],
+            options={
+                'verbose_name': 'Почасовая статистика рецепта',
+                'verbose_name_plural': 'Почасовая статистика рецептов',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='recipehourlystats',
+            constraint=models.UniqueConstraint(fields=('recipe', 'hour'), name='unique_recipe_hourly_stats'),
+        ),
+    ]
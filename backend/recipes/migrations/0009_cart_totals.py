@@ -0,0 +1,59 @@
+# Generated by Django 3.2.3 on 2026-10-19 15:17
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+import django.db.models.deletion
+
+
+def fill_cart_totals(apps, schema_editor):
+    CartTotal = apps.get_model('recipes', 'CartTotal')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    totals = RecipeIngredient.objects.filter(
+        recipe__shopping_list__isnull=False
+    ).values('recipe__shopping_list__user', 'ingredient').annotate(
+        total=Sum('amount'), recipes_count=Count('recipe', distinct=True)
+    ).values_list(
+        'recipe__shopping_list__user', 'ingredient', 'total',
+        'recipes_count',
+    ).order_by()
+    CartTotal.objects.bulk_create(
+        (
+            CartTotal(
+                user_id=user_id, ingredient_id=ingredient_id,
+                amount=amount, recipes=recipes,
+            )
+            for user_id, ingredient_id, amount, recipes in totals
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0008_recipe_duplicates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CartTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.PositiveIntegerField(default=0, verbose_name='Количество')),
+                ('recipes', models.PositiveIntegerField(default=0, verbose_name='Рецептов с ингредиентом')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='recipes.ingredient', verbose_name='Ингредиент')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cart_totals', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Итог списка покупок',
+                'verbose_name_plural': 'Итоги списков покупок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='carttotal',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_cart_total'),
+        ),
+        migrations.RunPython(fill_cart_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 3.2.3 on 2026-10-19 15:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0009_cart_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('recipe', 'Рецепт'), ('favorite', 'Избранное'), ('shopping_cart', 'Список покупок'), ('subscription', 'Подписка')], max_length=16, verbose_name='Тип объекта')),
+                ('object_id', models.BigIntegerField(verbose_name='Id рецепта или автора')),
+                ('deleted', models.BooleanField(default=False, verbose_name='Удален')),
+                ('changed_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Время изменения')),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Владелец')),
+            ],
+            options={
+                'verbose_name': 'Изменение для синхронизации',
+                'verbose_name_plural': 'Изменения для синхронизации',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='syncchange',
+            index=models.Index(fields=['user', 'id'], name='sync_change_user'),
+        ),
+    ]
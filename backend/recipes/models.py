@@ -15,6 +15,7 @@ from foodgram_backend.settings import (
     TAG_NAME_MAX_LENGTH,
     TAG_SLUG_MAX_LENGTH,
     RECIPE_ING_MAX_VOL_VALIDATOR,
+    RECIPE_IMAGE_PLACEHOLDER_MAX_LENGTH,
 )
 
 from users.models import User
@@ -88,6 +89,10 @@ class Ingredient(models.Model):
 class Recipe(models.Model):
     """ Модель рецепта. """
 
+    # Поля, которые пишут фоновые задачи через update(): обычное
+    # сохранение устаревшего экземпляра не должно их затирать
+    BACKGROUND_FIELDS = ('image_renditions', 'image_placeholder', 'popularity')
+
     name = models.CharField(
         max_length=RECIPE_NAME_MAX_LENGTH,
         verbose_name='Название блюда',
@@ -119,11 +124,33 @@ class Recipe(models.Model):
         upload_to='recipes/',
         verbose_name='Изображение блюда',
     )
+    image_renditions = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Уменьшенные копии изображения',
+    )
+    image_placeholder = models.CharField(
+        max_length=RECIPE_IMAGE_PLACEHOLDER_MAX_LENGTH,
+        blank=True,
+        editable=False,
+        verbose_name='BlurHash заглушка изображения',
+    )
     pub_date = models.DateTimeField(
         auto_now_add=True,
         db_index=True,
         verbose_name='Дата публикации'
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name='Дата изменения',
+    )
+    popularity = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Рейтинг за неделю',
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -143,10 +170,48 @@ class Recipe(models.Model):
         ordering = (
             '-pub_date',
         )
+        indexes = (
+            models.Index(
+                fields=('-popularity', '-pub_date'),
+                name='recipe_popularity',
+            ),
+            # Поиск готовых копий изображения с тем же содержимым
+            models.Index(fields=('image',), name='recipe_image'),
+        )
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        recipe = super().from_db(db, field_names, values)
+        recipe.saved_image = recipe.__dict__.get('image')
+        return recipe
+
+    def image_changed(self):
+        """ Изображение задано или заменено после загрузки из БД. """
+
+        if 'image' in self.get_deferred_fields():
+            return False
+        return self.image.name != getattr(self, 'saved_image', None)
+
+    def save(self, *args, **kwargs):
+        """ Сохранение существующего рецепта без BACKGROUND_FIELDS.
+
+            Поля не попадают в UPDATE, если update_fields не указаны
+            явно. Отложенные поля тоже не сохраняются, как в Model.save.
+        """
+
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            skipped = {*self.BACKGROUND_FIELDS, *self.get_deferred_fields()}
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in skipped
+            ]
+        super().save(*args, **kwargs)
+        if 'image' not in self.get_deferred_fields():
+            self.saved_image = self.image.name
+
 
 class RecipeIngredient(models.Model):
     """ Модель ингредиента для рецепта. """
@@ -180,6 +245,12 @@ class RecipeIngredient(models.Model):
     class Meta:
         verbose_name = 'Ингредиент для рецепта'
         verbose_name_plural = 'Ингредиенты для рецепта'
+        indexes = (
+            models.Index(
+                fields=('ingredient', 'recipe'),
+                name='recipe_ingredient_lookup',
+            ),
+        )
 
     def __str__(self):
         return f'{self.ingredient} - {self.amount}'
@@ -220,6 +291,11 @@ class ShoppingCart(models.Model):
         related_name='shopping_list',
         verbose_name='Рецепт',
     )
+    added_at = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='Добавлен в список покупок',
+    )
 
     class Meta:
         verbose_name = 'Список покупок'
@@ -253,6 +329,11 @@ class Favorite(models.Model):
         related_name='favorite',
         verbose_name='Рецепт',
     )
+    added_at = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='Добавлен в избранное',
+    )
 
     class Meta:
         verbose_name = 'Избранный рецепт'
@@ -269,3 +350,375 @@ class Favorite(models.Model):
 
     def __str__(self):
         return f'{self.user} добавил {self.recipe}'
+
+
+class RecipeHourlyStats(models.Model):
+    """ Почасовая сводка добавлений рецепта в избранное и покупки. """
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='hourly_stats',
+        verbose_name='Рецепт',
+    )
+    hour = models.DateTimeField(
+        db_index=True,
+        verbose_name='Час',
+    )
+    favorites = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Добавлений в избранное',
+    )
+    carts = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Добавлений в список покупок',
+    )
+
+    class Meta:
+        verbose_name = 'Почасовая статистика рецепта'
+        verbose_name_plural = 'Почасовая статистика рецептов'
+        constraints = (
+            models.UniqueConstraint(
+                fields=(
+                    'recipe',
+                    'hour'
+                ),
+                name='unique_recipe_hourly_stats'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.recipe} - {self.hour}'
+
+
+class FeedItem(models.Model):
+    """ Запись ленты подписок пользователя.
+
+        Записи создаются при публикации рецепта для всех подписчиков
+        автора, pub_date дублируется из рецепта для чтения ленты по
+        индексу без join.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_items',
+        verbose_name='Подписчик',
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_items',
+        verbose_name='Рецепт',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор рецепта',
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации',
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = (
+            models.UniqueConstraint(
+                fields=(
+                    'user',
+                    'recipe'
+                ),
+                name='unique_feed_item'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', '-pub_date', '-recipe'),
+                name='feed_item_user_pub_date',
+            ),
+            models.Index(
+                fields=('user', 'author'),
+                name='feed_item_user_author',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.recipe} в ленте {self.user}'
+
+
+class PopularAuthor(models.Model):
+    """ Автор, рецепты которого подмешиваются в ленту при чтении.
+
+        Для авторов с большим числом подписчиков записи ленты не
+        создаются.
+    """
+
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='popular_author',
+        verbose_name='Автор',
+    )
+
+    class Meta:
+        verbose_name = 'Популярный автор'
+        verbose_name_plural = 'Популярные авторы'
+
+    def __str__(self):
+        return str(self.author)
+
+
+class SimilarRecipe(models.Model):
+    """ Предрассчитанный похожий рецепт.
+
+        Заполняется командой refresh_similar по косинусной близости
+        ингредиентов и тегов рецептов.
+    """
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_recipes',
+        verbose_name='Рецепт',
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Похожий рецепт',
+    )
+    score = models.FloatField(
+        verbose_name='Близость',
+    )
+
+    class Meta:
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        constraints = (
+            models.UniqueConstraint(
+                fields=(
+                    'recipe',
+                    'similar'
+                ),
+                name='unique_similar_recipe'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('recipe', '-score'),
+                name='similar_recipe_score',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.recipe} похож на {self.similar}'
+
+
+class SimilarityRun(models.Model):
+    """ Запуск пересчета похожих рецептов.
+
+        started_at последнего запуска - граница, начиная с которой
+        следующий запуск берет измененные рецепты.
+    """
+
+    started_at = models.DateTimeField(
+        db_index=True,
+        verbose_name='Начало пересчета',
+    )
+    recipes = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Пересчитано рецептов',
+    )
+
+    class Meta:
+        verbose_name = 'Пересчет похожих рецептов'
+        verbose_name_plural = 'Пересчеты похожих рецептов'
+
+    def __str__(self):
+        return str(self.started_at)
+
+
+class RecipeSignature(models.Model):
+    """ MinHash подпись ингредиентов и текста рецепта. """
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='signature',
+        verbose_name='Рецепт',
+    )
+    minhash = models.BinaryField(
+        verbose_name='MinHash подпись',
+    )
+
+    class Meta:
+        verbose_name = 'Подпись рецепта'
+        verbose_name_plural = 'Подписи рецептов'
+
+    def __str__(self):
+        return str(self.recipe)
+
+
+class RecipeBucket(models.Model):
+    """ LSH корзина рецепта: хеш одной полосы MinHash подписи. """
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='lsh_buckets',
+        verbose_name='Рецепт',
+    )
+    bucket = models.BigIntegerField(
+        db_index=True,
+        verbose_name='Корзина',
+    )
+
+    class Meta:
+        verbose_name = 'LSH корзина рецепта'
+        verbose_name_plural = 'LSH корзины рецептов'
+
+    def __str__(self):
+        return f'{self.recipe} - {self.bucket}'
+
+
+class RecipeDuplicate(models.Model):
+    """ Найденный вероятный дубль рецепта. """
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='duplicates',
+        verbose_name='Рецепт',
+    )
+    duplicate = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Вероятный дубль',
+    )
+    similarity = models.FloatField(
+        verbose_name='Оценка сходства',
+    )
+
+    class Meta:
+        verbose_name = 'Вероятный дубль рецепта'
+        verbose_name_plural = 'Вероятные дубли рецептов'
+        constraints = (
+            models.UniqueConstraint(
+                fields=(
+                    'recipe',
+                    'duplicate'
+                ),
+                name='unique_recipe_duplicate'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.recipe} похож на {self.duplicate}'
+
+
+class CartTotal(models.Model):
+    """ Итог списка покупок пользователя по ингредиенту.
+
+        Обновляется приращениями при изменении списка покупок и
+        ингредиентов рецептов из него.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='cart_totals',
+        verbose_name='Пользователь',
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Ингредиент',
+    )
+    amount = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество',
+    )
+    recipes = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Рецептов с ингредиентом',
+    )
+
+    class Meta:
+        verbose_name = 'Итог списка покупок'
+        verbose_name_plural = 'Итоги списков покупок'
+        constraints = (
+            models.UniqueConstraint(
+                fields=(
+                    'user',
+                    'ingredient'
+                ),
+                name='unique_cart_total'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.user}: {self.ingredient} - {self.amount}'
+
+
+class SyncChange(models.Model):
+    """ Журнал изменений для синхронизации клиентов.
+
+        id записи - монотонный токен синхронизации. user - владелец
+        изменения: автор для рецептов, пользователь для избранного,
+        списка покупок и подписок. deleted - отметка удаления.
+        Записи журнала переживают удаление владельца: отметки об
+        удалении его рецептов нужны подписчикам.
+    """
+
+    RECIPE = 'recipe'
+    FAVORITE = 'favorite'
+    SHOPPING_CART = 'shopping_cart'
+    SUBSCRIPTION = 'subscription'
+    KINDS = (
+        (RECIPE, 'Рецепт'),
+        (FAVORITE, 'Избранное'),
+        (SHOPPING_CART, 'Список покупок'),
+        (SUBSCRIPTION, 'Подписка'),
+    )
+
+    kind = models.CharField(
+        max_length=16,
+        choices=KINDS,
+        verbose_name='Тип объекта',
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        verbose_name='Владелец',
+    )
+    object_id = models.BigIntegerField(
+        verbose_name='Id рецепта или автора',
+    )
+    deleted = models.BooleanField(
+        default=False,
+        verbose_name='Удален',
+    )
+    changed_at = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='Время изменения',
+    )
+
+    class Meta:
+        verbose_name = 'Изменение для синхронизации'
+        verbose_name_plural = 'Изменения для синхронизации'
+        indexes = (
+            models.Index(
+                fields=('user', 'id'),
+                name='sync_change_user',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.kind} {self.object_id}'
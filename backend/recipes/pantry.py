@@ -0,0 +1,238 @@
+import threading
+import time
+from array import array
+from bisect import bisect_left, insort
+
+import numpy as np
+from django.utils import timezone
+
+from foodgram_backend.settings import (
+    PANTRY_INDEX_REBUILD_THRESHOLD,
+    PANTRY_INDEX_SYNC_INTERVAL,
+)
+from recipes.models import Recipe, RecipeIngredient, RecipeTags, SyncChange
+
+
+def load_postings(queryset):
+    """ Отсортированные массивы id рецептов по id признака.
+
+        queryset - пары (id признака, id рецепта) в порядке возрастания.
+    """
+
+    postings = {}
+    for key, recipe_id in queryset.distinct().iterator(chunk_size=10000):
+        postings.setdefault(key, array('q')).append(recipe_id)
+    return postings
+
+
+def discard(posting, recipe_id):
+    """ Удаление id рецепта из отсортированного массива. """
+
+    position = bisect_left(posting, recipe_id)
+    if position < len(posting) and posting[position] == recipe_id:
+        del posting[position]
+
+
+def concatenate(postings):
+    """ Копия массивов id рецептов одним массивом numpy. """
+
+    if not postings:
+        return np.empty(0, dtype=np.int64)
+    return np.concatenate([
+        np.frombuffer(posting, dtype=np.int64) for posting in postings
+    ])
+
+
+class PantryResults:
+    """ Результаты поиска с сортировкой только запрошенного среза.
+
+        Лучшие stop результатов отбираются частичной сортировкой
+        np.partition по покрытию, полностью сортируются только они и
+        рецепты с тем же покрытием, что у последнего из них.
+    """
+
+    def __init__(self, coverage, missing, recipe_ids):
+        self.coverage = coverage
+        self.missing = missing
+        self.recipe_ids = recipe_ids
+
+    def __len__(self):
+        return len(self.recipe_ids)
+
+    def top(self, count):
+        """ Индексы count лучших результатов по порядку. """
+
+        candidates = np.arange(len(self))
+        if count < len(self):
+            threshold = np.partition(-self.coverage, count - 1)[count - 1]
+            candidates = np.flatnonzero(-self.coverage <= threshold)
+        order = np.lexsort((
+            -self.recipe_ids[candidates],
+            self.missing[candidates],
+            -self.coverage[candidates],
+        ))
+        return candidates[order[:count]]
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop, step = index.indices(len(self))
+        if stop <= start:
+            return []
+        positions = self.top(stop)[start:stop:step]
+        return list(zip(
+            self.coverage[positions].tolist(),
+            self.missing[positions].tolist(),
+            self.recipe_ids[positions].tolist(),
+        ))
+
+
+class PantryIndex:
+    """ Инвертированный индекс ингредиент -> рецепты в памяти процесса.
+
+        Для каждого ингредиента и тега хранится отсортированный массив
+        id рецептов, число ингредиентов рецепта - в массиве по id
+        рецепта. Индекс строится при первом поиске, изменения
+        рецептов в процессе приходят через сигналы, изменения из
+        других процессов подтягиваются по Recipe.updated_at, удаления -
+        по журналу SyncChange не чаще раза в PANTRY_INDEX_SYNC_INTERVAL
+        секунд.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.ingredients = None
+        self.tags = None
+        self.sizes = None
+        self.synced_at = None
+        self.checked_at = 0
+
+    def build(self):
+        """ Построение индекса по всем рецептам. """
+
+        synced_at = timezone.now()
+        ingredients = load_postings(
+            RecipeIngredient.objects.values_list(
+                'ingredient_id', 'recipe_id'
+            ).order_by('ingredient_id', 'recipe_id')
+        )
+        tags = load_postings(
+            RecipeTags.objects.values_list(
+                'tag_id', 'recipe_id'
+            ).order_by('tag_id', 'recipe_id')
+        )
+        sizes = array('H')
+        for posting in ingredients.values():
+            for recipe_id in posting:
+                if recipe_id >= len(sizes):
+                    sizes.extend(bytes(2 * (recipe_id + 1 - len(sizes))))
+                sizes[recipe_id] += 1
+        with self.lock:
+            self.ingredients, self.tags, self.sizes = ingredients, tags, sizes
+            self.synced_at = synced_at
+            self.checked_at = time.monotonic()
+
+    def remove(self, recipe_ids):
+        """ Удаление рецептов из индекса. """
+
+        with self.lock:
+            if self.ingredients is None:
+                return
+            for postings in (self.ingredients, self.tags):
+                for posting in postings.values():
+                    for recipe_id in recipe_ids:
+                        discard(posting, recipe_id)
+            for recipe_id in recipe_ids:
+                if recipe_id < len(self.sizes):
+                    self.sizes[recipe_id] = 0
+
+    def refresh(self, recipe_ids):
+        """ Перечитывание ингредиентов и тегов рецептов из БД. """
+
+        if self.ingredients is None:
+            return
+        if len(recipe_ids) > PANTRY_INDEX_REBUILD_THRESHOLD:
+            self.build()
+            return
+        ingredients = RecipeIngredient.objects.filter(
+            recipe__in=recipe_ids
+        ).values_list('ingredient_id', 'recipe_id').distinct()
+        tags = RecipeTags.objects.filter(
+            recipe__in=recipe_ids
+        ).values_list('tag_id', 'recipe_id').distinct()
+        ingredients, tags = list(ingredients), list(tags)
+        with self.lock:
+            self.remove(recipe_ids)
+            for postings, pairs in (
+                (self.ingredients, ingredients), (self.tags, tags)
+            ):
+                for key, recipe_id in pairs:
+                    insort(postings.setdefault(key, array('q')), recipe_id)
+            for _, recipe_id in ingredients:
+                if recipe_id >= len(self.sizes):
+                    self.sizes.extend(
+                        bytes(2 * (recipe_id + 1 - len(self.sizes)))
+                    )
+                self.sizes[recipe_id] += 1
+
+    def sync(self):
+        """ Построение индекса или догрузка измененных рецептов. """
+
+        if self.ingredients is None:
+            with self.lock:
+                if self.ingredients is None:
+                    self.build()
+            return
+        if time.monotonic() - self.checked_at < PANTRY_INDEX_SYNC_INTERVAL:
+            return
+        synced_at = timezone.now()
+        self.checked_at = time.monotonic()
+        recipe_ids = set(Recipe.objects.filter(
+            updated_at__gte=self.synced_at
+        ).values_list('id', flat=True))
+        # Удаленные рецепты перечитываются из БД и пропадают из индекса
+        recipe_ids.update(SyncChange.objects.filter(
+            kind=SyncChange.RECIPE,
+            deleted=True,
+            changed_at__gte=self.synced_at,
+        ).values_list('object_id', flat=True))
+        if recipe_ids:
+            self.refresh(list(recipe_ids))
+        self.synced_at = synced_at
+
+    def search(self, ingredient_ids, tag_ids=None):
+        """ Рецепты по покрытию набора ингредиентов.
+
+            Возвращает PantryResults: срезы - списки (покрытие, не
+            хватает ингредиентов, id рецепта) по убыванию покрытия,
+            затем по возрастанию числа недостающих. tag_ids
+            ограничивает рецепты тегами.
+        """
+
+        ingredient_ids = set(ingredient_ids)
+        if tag_ids is not None:
+            tag_ids = set(tag_ids)
+        self.sync()
+        with self.lock:
+            postings = concatenate([
+                self.ingredients[ingredient_id]
+                for ingredient_id in ingredient_ids
+                if ingredient_id in self.ingredients
+            ])
+            allowed = None
+            if tag_ids is not None:
+                allowed = concatenate([
+                    self.tags[tag_id] for tag_id in tag_ids
+                    if tag_id in self.tags
+                ])
+            sizes = np.frombuffer(self.sizes, dtype=np.uint16)
+            counts = np.bincount(postings)
+            recipe_ids = np.flatnonzero(counts)
+            if allowed is not None:
+                recipe_ids = recipe_ids[np.isin(recipe_ids, allowed)]
+            counts = counts[recipe_ids]
+            sizes = sizes[recipe_ids].astype(np.int64)
+        return PantryResults(counts / sizes, sizes - counts, recipe_ids)
+
+
+pantry_index = PantryIndex()
@@ -0,0 +1,110 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from recipes.models import (
+    Favorite, Recipe, RecipeHourlyStats, ShoppingCart,
+)
+
+POPULARITY_WINDOWS = {
+    '24h': timedelta(hours=24),
+    '7d': timedelta(days=7),
+}
+DEFAULT_POPULARITY_WINDOW = '7d'
+
+
+def window_start(window):
+    """ Начало окна, выровненное по часу. """
+
+    start = timezone.now() - POPULARITY_WINDOWS[window]
+    return start.replace(minute=0, second=0, microsecond=0)
+
+
+def count_additions(model, start):
+    """ Добавления рецептов в model по часам начиная со start. """
+
+    queryset = model.objects.all()
+    if start is not None:
+        queryset = queryset.filter(added_at__gte=start)
+    return queryset.annotate(
+        hour=TruncHour('added_at')
+    ).values_list('recipe', 'hour').annotate(amount=Count('id')).order_by()
+
+
+def refresh_hourly_stats():
+    """ Инкрементальное обновление почасовой статистики.
+
+        Пересчитываются только часы начиная с последнего часа,
+        уже попавшего в сводку: он мог быть неполным. Возвращает
+        количество обновленных строк сводки.
+    """
+
+    last = RecipeHourlyStats.objects.order_by('-hour').first()
+    start = last.hour if last else None
+    stats = {}
+    for field, model in (('favorites', Favorite), ('carts', ShoppingCart)):
+        for recipe_id, hour, amount in count_additions(model, start):
+            stats.setdefault(
+                (recipe_id, hour), {'favorites': 0, 'carts': 0}
+            )[field] = amount
+    with transaction.atomic():
+        if start is not None:
+            RecipeHourlyStats.objects.filter(hour__gte=start).delete()
+        RecipeHourlyStats.objects.bulk_create(
+            (
+                RecipeHourlyStats(recipe_id=recipe_id, hour=hour, **amounts)
+                for (recipe_id, hour), amounts in stats.items()
+            ),
+            batch_size=1000,
+        )
+    return len(stats)
+
+
+def window_stats(window):
+    return RecipeHourlyStats.objects.filter(hour__gte=window_start(window))
+
+
+def window_scores(window):
+    """ Рейтинг рецептов за окно по сводке. """
+
+    return window_stats(window).values('recipe').annotate(
+        score=Sum(F('favorites') + F('carts'))
+    )
+
+
+def refresh_popularity(window=DEFAULT_POPULARITY_WINDOW):
+    """ Перенос рейтинга за окно в Recipe.popularity.
+
+        Сортировка ordering=popular идет по индексу этого поля, а не
+        подзапросом к сводке для каждого рецепта. Обновляются только
+        рецепты, у которых рейтинг изменился. Возвращает их
+        количество.
+    """
+
+    scores = dict(window_scores(window).values_list(
+        'recipe', 'score'
+    ).order_by())
+    current = dict(Recipe.objects.filter(popularity__gt=0).values_list(
+        'pk', 'popularity'
+    ).order_by())
+    changed = [
+        Recipe(pk=recipe_id, popularity=score)
+        for recipe_id, score in scores.items()
+        if current.get(recipe_id) != score
+    ]
+    outdated = current.keys() - scores.keys()
+    with transaction.atomic():
+        Recipe.objects.filter(pk__in=outdated).update(popularity=0)
+        Recipe.objects.bulk_update(changed, ('popularity',), batch_size=1000)
+    return len(changed) + len(outdated)
+
+
+def trending_recipe_ids(window):
+    """ Id рецептов по убыванию рейтинга за окно. """
+
+    return window_scores(window).order_by(
+        '-score', '-recipe_id'
+    ).values_list('recipe', flat=True)
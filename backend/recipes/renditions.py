@@ -0,0 +1,220 @@
+import math
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image
+
+from foodgram_backend.settings import (
+    RECIPE_IMAGE_RENDITION_WIDTHS,
+    RECIPE_IMAGE_WORKERS,
+)
+from recipes.background import run_on_commit
+from recipes.models import Recipe, SyncChange
+from recipes.sync import record_change
+
+BASE83 = (
+    '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    'abcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~'
+)
+BLURHASH_COMPONENTS = (4, 3)
+BLURHASH_SAMPLE_SIZE = 32
+# Форматы копий: формат оригинала и WebP
+RENDITION_FORMATS = {'image': None, 'webp': 'WEBP'}
+
+
+def encode83(value, length):
+    return ''.join(
+        BASE83[value // 83 ** (length - i) % 83]
+        for i in range(1, length + 1)
+    )
+
+
+def srgb_to_linear(value):
+    value = value / 255
+    if value <= 0.04045:
+        return value / 12.92
+    return ((value + 0.055) / 1.055) ** 2.4
+
+
+def linear_to_srgb(value):
+    value = max(0.0, min(1.0, value))
+    if value <= 0.0031308:
+        return int(value * 12.92 * 255 + 0.5)
+    return int((1.055 * value ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def blurhash(image):
+    """ BlurHash изображения по уменьшенной до 32px копии. """
+
+    x_components, y_components = BLURHASH_COMPONENTS
+    sample = image.convert('RGB').resize(
+        (BLURHASH_SAMPLE_SIZE, BLURHASH_SAMPLE_SIZE)
+    )
+    width, height = sample.size
+    pixels = [
+        tuple(srgb_to_linear(channel) for channel in pixel)
+        for pixel in sample.getdata()
+    ]
+    factors = []
+    for j in range(y_components):
+        cos_y = [math.cos(math.pi * j * y / height) for y in range(height)]
+        for i in range(x_components):
+            cos_x = [math.cos(math.pi * i * x / width) for x in range(width)]
+            norm = (1 if i == j == 0 else 2) / (width * height)
+            r = g = b = 0.0
+            for y in range(height):
+                for x in range(width):
+                    basis = cos_x[x] * cos_y[y]
+                    pixel = pixels[y * width + x]
+                    r += basis * pixel[0]
+                    g += basis * pixel[1]
+                    b += basis * pixel[2]
+            factors.append((r * norm, g * norm, b * norm))
+    dc, ac = factors[0], factors[1:]
+    result = encode83((x_components - 1) + (y_components - 1) * 9, 1)
+    max_value = max(abs(value) for factor in ac for value in factor)
+    quantised_max = max(0, min(82, int(max_value * 166 - 0.5)))
+    max_value = (quantised_max + 1) / 166
+    result += encode83(quantised_max, 1)
+    result += encode83(
+        (linear_to_srgb(dc[0]) << 16)
+        + (linear_to_srgb(dc[1]) << 8)
+        + linear_to_srgb(dc[2]),
+        4,
+    )
+    for factor in ac:
+        r, g, b = (
+            max(0, min(18, int(
+                math.copysign(abs(value / max_value) ** 0.5, value)
+                * 9 + 9.5
+            )))
+            for value in factor
+        )
+        result += encode83(r * 19 * 19 + g * 19 + b, 2)
+    return result
+
+
+def save_rendition(storage, image, name, image_format):
+    """ Сохраняем копию изображения и возвращаем имя из хранилища.
+
+        Хранилище с адресацией по содержимому заменяет name на хеш
+        содержимого и не перезаписывает уже сохраненный файл.
+    """
+
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    content = BytesIO()
+    image.save(content, format=image_format)
+    return storage.save(name, ContentFile(content.getvalue()))
+
+
+def find_renditions(storage, name):
+    """ Сохраненные копии и BlurHash изображения name.
+
+        Имя оригинала - хеш его содержимого, поэтому подходят копии
+        любого рецепта с тем же изображением. Возвращает
+        ({ширина: {формат: имя}}, BlurHash или None), копии без файла
+        в хранилище пропускаются.
+    """
+
+    found = Recipe.objects.filter(
+        image=name, image_renditions__source=name
+    ).exclude(image_placeholder='').values_list(
+        'image_renditions', 'image_placeholder'
+    ).first()
+    if found is None:
+        return {}, None
+    renditions, placeholder = found
+    return {
+        width: {
+            kind: rendition for kind, rendition in names.items()
+            if storage.exists(rendition)
+        }
+        for width, names in renditions.get('sizes', {}).items()
+    }, placeholder
+
+
+def make_renditions(recipe_id, force=False):
+    """ Уменьшенные копии, WebP и BlurHash изображения рецепта.
+
+        Копии сохраняются в каталог оригинала. Уже сохраненные копии
+        того же изображения берутся без повторного кодирования, с force
+        все копии строятся заново. Поля рецепта обновляются только
+        если изображение не изменилось за время обработки.
+    """
+
+    recipe = Recipe.objects.filter(pk=recipe_id).only(
+        'image', 'author'
+    ).first()
+    if recipe is None or not recipe.image:
+        return
+    name = recipe.image.name
+    storage = recipe.image.storage
+    stem, ext = os.path.splitext(name)
+    found, placeholder = ({}, None) if force else find_renditions(
+        storage, name
+    )
+    sizes = {
+        str(width): found.get(str(width), {})
+        for width in RECIPE_IMAGE_RENDITION_WIDTHS
+    }
+    if placeholder is None or any(
+        len(names) < len(RENDITION_FORMATS) for names in sizes.values()
+    ):
+        with storage.open(name) as file, Image.open(file) as image:
+            image.load()
+            for width in RECIPE_IMAGE_RENDITION_WIDTHS:
+                names = sizes[str(width)]
+                rendition = None
+                for kind, image_format in RENDITION_FORMATS.items():
+                    if kind in names:
+                        continue
+                    if rendition is None:
+                        rendition = image.copy()
+                        rendition.thumbnail((width, image.height))
+                    suffix = (
+                        ext if image_format is None
+                        else f'.{image_format.lower()}'
+                    )
+                    names[kind] = save_rendition(
+                        storage, rendition, f'{stem}_w{width}{suffix}',
+                        image_format or image.format,
+                    )
+            if placeholder is None:
+                placeholder = blurhash(image)
+    updated = Recipe.objects.filter(pk=recipe_id, image=name).update(
+        image_renditions={'source': name, 'sizes': sizes},
+        image_placeholder=placeholder,
+    )
+    if updated:
+        record_change(SyncChange.RECIPE, recipe.author_id, recipe_id)
+
+
+def schedule_renditions(recipe):
+    """ Генерация копий в фоне после коммита транзакции с рецептом. """
+
+    run_on_commit(
+        'renditions', RECIPE_IMAGE_WORKERS, make_renditions, recipe.pk
+    )
+
+
+def renditions_outdated(recipe):
+    return bool(recipe.image) and (
+        recipe.image_renditions.get('source') != recipe.image.name
+    )
+
+
+def get_rendition_urls(renditions, request=None):
+    """ Url копий изображения по ширине и формату. """
+
+    storage = Recipe._meta.get_field('image').storage
+    urls = {}
+    for width, names in renditions.get('sizes', {}).items():
+        urls[width] = {}
+        for kind, name in names.items():
+            url = storage.url(name)
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            urls[width][kind] = url
+    return urls
@@ -0,0 +1,143 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from foodgram_backend.settings import FEED_WORKERS, RECIPE_DUPLICATES_WORKERS
+from recipes.background import run_on_commit
+from recipes.cart import add_to_cart_totals, remove_from_cart_totals
+from recipes.duplicates import index_recipe
+from recipes.feed import backfill_feed, clear_feed, fan_out_recipe
+from recipes.models import (
+    Favorite, Recipe, RecipeIngredient, RecipeTags, ShoppingCart, SyncChange,
+)
+from recipes.pantry import pantry_index
+from recipes.renditions import schedule_renditions
+from recipes.sync import record_change
+from users.models import Subscription
+
+
+@receiver(post_save, sender=Recipe)
+def make_recipe_image_renditions(sender, instance, **kwargs):
+    """ Запуск генерации копий после загрузки нового изображения. """
+
+    if instance.image_changed() and instance.image:
+        schedule_renditions(instance)
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_published_recipe(sender, instance, created, **kwargs):
+    """ Рассылка нового рецепта в ленты подписчиков в фоне. """
+
+    if created:
+        run_on_commit('feed', FEED_WORKERS, fan_out_recipe, instance.pk)
+
+
+@receiver(post_save, sender=Recipe)
+def index_recipe_duplicates(sender, instance, **kwargs):
+    """ Пересчет MinHash подписи и дублей рецепта в фоне. """
+
+    run_on_commit(
+        'duplicates', RECIPE_DUPLICATES_WORKERS, index_recipe, instance.pk
+    )
+
+
+@receiver(post_save, sender=Subscription)
+def backfill_subscriber_feed(sender, instance, created, **kwargs):
+    if created:
+        run_on_commit(
+            'feed', FEED_WORKERS, backfill_feed,
+            instance.user_id, instance.author_id,
+        )
+
+
+@receiver(post_delete, sender=Subscription)
+def clear_unsubscribed_feed(sender, instance, **kwargs):
+    clear_feed(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+@receiver(post_save, sender=RecipeTags)
+@receiver(post_delete, sender=RecipeTags)
+def refresh_pantry_index(sender, instance, **kwargs):
+    """ Обновление рецепта в индексе ингредиентов после коммита. """
+
+    recipe_id = instance.pk if sender is Recipe else instance.recipe_id
+    transaction.on_commit(partial(pantry_index.refresh, [recipe_id]))
+
+
+@receiver(post_delete, sender=Recipe)
+def remove_from_pantry_index(sender, instance, **kwargs):
+    transaction.on_commit(partial(pantry_index.remove, [instance.pk]))
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_cart_totals(sender, instance, created, **kwargs):
+    if created:
+        add_to_cart_totals(instance.user_id, instance.recipe_id)
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def remove_cart_totals(sender, instance, **kwargs):
+    """ Вычитание рецепта из итогов до удаления его ингредиентов.
+
+        При удалении рецепта каскадом pre_delete приходит раньше
+        удаления RecipeIngredient.
+    """
+
+    remove_from_cart_totals(instance.user_id, instance.recipe_id)
+
+
+SYNC_KINDS = {
+    Favorite: SyncChange.FAVORITE,
+    ShoppingCart: SyncChange.SHOPPING_CART,
+}
+
+
+@receiver(post_save, sender=Recipe)
+def record_recipe_change(sender, instance, **kwargs):
+    record_change(SyncChange.RECIPE, instance.author_id, instance.pk)
+
+
+@receiver(post_delete, sender=Recipe)
+def record_recipe_deletion(sender, instance, **kwargs):
+    record_change(
+        SyncChange.RECIPE, instance.author_id, instance.pk, deleted=True
+    )
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def record_user_list_change(sender, instance, created, **kwargs):
+    if created:
+        record_change(
+            SYNC_KINDS[sender], instance.user_id, instance.recipe_id
+        )
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def record_user_list_deletion(sender, instance, **kwargs):
+    record_change(
+        SYNC_KINDS[sender], instance.user_id, instance.recipe_id,
+        deleted=True,
+    )
+
+
+@receiver(post_save, sender=Subscription)
+def record_subscription_change(sender, instance, created, **kwargs):
+    if created:
+        record_change(
+            SyncChange.SUBSCRIPTION, instance.user_id, instance.author_id
+        )
+
+
+@receiver(post_delete, sender=Subscription)
+def record_subscription_deletion(sender, instance, **kwargs):
+    record_change(
+        SyncChange.SUBSCRIPTION, instance.user_id, instance.author_id,
+        deleted=True,
+    )
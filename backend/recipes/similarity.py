@@ -0,0 +1,212 @@
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+from scipy import sparse
+
+from foodgram_backend.settings import (
+    SIMILAR_RECIPES_BATCH_SIZE,
+    SIMILAR_RECIPES_COUNT,
+    SIMILAR_RECIPES_TAG_WEIGHT,
+)
+from recipes.models import (
+    Recipe, RecipeIngredient, RecipeTags, SimilarityRun, SimilarRecipe,
+)
+
+
+def load_pairs(queryset, recipe_ids):
+    """ Пары (индекс рецепта, id признака) для известных рецептов. """
+
+    pairs = np.array(list(queryset.distinct()), dtype=np.int64)
+    pairs = pairs.reshape(-1, 2)
+    pairs = pairs[np.isin(pairs[:, 0], recipe_ids)]
+    return np.searchsorted(recipe_ids, pairs[:, 0]), pairs[:, 1]
+
+
+def load_vectors():
+    """ Нормированные разреженные векторы всех рецептов.
+
+        Строка матрицы - рецепт в порядке возрастания id, столбцы -
+        ингредиенты и теги. Вес тега SIMILAR_RECIPES_TAG_WEIGHT,
+        ингредиента - 1, после нормировки строк произведение матриц
+        дает косинусную близость.
+    """
+
+    recipe_ids = np.fromiter(
+        Recipe.objects.order_by('id').values_list('id', flat=True),
+        dtype=np.int64,
+    )
+    ing_rows, ing_ids = load_pairs(
+        RecipeIngredient.objects.values_list('recipe_id', 'ingredient_id'),
+        recipe_ids,
+    )
+    tag_rows, tag_ids = load_pairs(
+        RecipeTags.objects.values_list('recipe_id', 'tag_id'),
+        recipe_ids,
+    )
+    ing_ids, ing_columns = np.unique(ing_ids, return_inverse=True)
+    tag_ids, tag_columns = np.unique(tag_ids, return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (
+            np.concatenate((
+                np.ones(len(ing_rows)),
+                np.full(len(tag_rows), SIMILAR_RECIPES_TAG_WEIGHT),
+            )),
+            (
+                np.concatenate((ing_rows, tag_rows)),
+                np.concatenate((ing_columns, len(ing_ids) + tag_columns)),
+            ),
+        ),
+        shape=(len(recipe_ids), len(ing_ids) + len(tag_ids)),
+    )
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return recipe_ids, sparse.diags(1 / norms) @ matrix
+
+
+def top_similar(vectors, rows, count):
+    """ Топ count ближайших рецептов для строк rows пачками.
+
+        Возвращает пары (индекс строки, [(индекс соседа, близость)]).
+    """
+
+    for start in range(0, len(rows), SIMILAR_RECIPES_BATCH_SIZE):
+        batch = rows[start:start + SIMILAR_RECIPES_BATCH_SIZE]
+        scores = (vectors[batch] @ vectors.T).tocsr()
+        for position, row in enumerate(batch):
+            begin, end = scores.indptr[position:position + 2]
+            columns = scores.indices[begin:end]
+            values = scores.data[begin:end]
+            mask = (columns != row) & (values > 0)
+            columns, values = columns[mask], values[mask]
+            if len(values) > count:
+                best = np.argpartition(-values, count - 1)[:count]
+                columns, values = columns[best], values[best]
+            order = np.lexsort((columns, -values))
+            yield row, list(zip(columns[order], values[order]))
+
+
+def save_similar(recipe_ids, neighbours):
+    """ Замена похожих рецептов пачками.
+
+        neighbours - пары (индекс рецепта, [(индекс соседа, близость)]).
+    """
+
+    batch = {}
+    for row, similar in neighbours:
+        batch[row] = similar
+        if len(batch) >= SIMILAR_RECIPES_BATCH_SIZE:
+            save_similar_batch(recipe_ids, batch)
+            batch = {}
+    save_similar_batch(recipe_ids, batch)
+
+
+def save_similar_batch(recipe_ids, neighbours):
+    """ Замена соседей одной пачки рецептов в транзакции. """
+
+    with transaction.atomic():
+        SimilarRecipe.objects.filter(
+            recipe__in=[int(recipe_ids[row]) for row in neighbours]
+        ).delete()
+        SimilarRecipe.objects.bulk_create(
+            (
+                SimilarRecipe(
+                    recipe_id=int(recipe_ids[row]),
+                    similar_id=int(recipe_ids[column]),
+                    score=float(score),
+                )
+                for row, similar in neighbours.items()
+                for column, score in similar
+            ),
+            batch_size=1000,
+        )
+
+
+def merge_candidates(recipe_ids, vectors, changed, count):
+    """ Неизмененные рецепты, в топ которых входят измененные.
+
+        Близость к измененным рецептам считается пачками, у рецепта
+        берутся только кандидаты лучше худшего из его сохраненных
+        соседей или при неполном списке. Возвращает словарь
+        {индекс рецепта: {индекс соседа: близость}}.
+    """
+
+    limits = {
+        recipe: (amount, worst)
+        for recipe, amount, worst in SimilarRecipe.objects.values(
+            'recipe'
+        ).annotate(
+            amount=Count('id'), worst=Min('score')
+        ).values_list('recipe', 'amount', 'worst').order_by()
+    }
+    changed_set = set(changed.tolist())
+    candidates = {}
+    for start in range(0, len(changed), SIMILAR_RECIPES_BATCH_SIZE):
+        batch = changed[start:start + SIMILAR_RECIPES_BATCH_SIZE]
+        scores = (vectors @ vectors[batch].T).tocoo()
+        for row, position, score in zip(
+            scores.row, scores.col, scores.data
+        ):
+            if row in changed_set or score <= 0:
+                continue
+            amount, worst = limits.get(int(recipe_ids[row]), (0, 0))
+            if amount < count or score > worst:
+                candidates.setdefault(int(row), {})[
+                    int(batch[position])
+                ] = float(score)
+    return candidates
+
+
+def refresh_similar(full=False, count=SIMILAR_RECIPES_COUNT):
+    """ Пересчет похожих рецептов. Возвращает число пересчитанных.
+
+        Полностью пересчитываются рецепты, измененные с начала
+        прошлого запуска, и рецепты, в соседях которых они были.
+        Остальным рецептам измененные добавляются в топ слиянием с
+        уже сохраненными соседями. При full пересчитываются все.
+    """
+
+    started_at = timezone.now()
+    last = SimilarityRun.objects.order_by('-started_at').first()
+    recipe_ids, vectors = load_vectors()
+    if full or last is None:
+        changed = np.arange(len(recipe_ids))
+    else:
+        changed_ids = Recipe.objects.filter(
+            updated_at__gte=last.started_at
+        ).values_list('id', flat=True)
+        changed_ids = np.fromiter(changed_ids, dtype=np.int64)
+        changed = np.searchsorted(
+            recipe_ids, changed_ids[np.isin(changed_ids, recipe_ids)]
+        )
+    merge = {}
+    if not full and last is not None and len(changed):
+        merge = merge_candidates(recipe_ids, vectors, changed, count)
+        stale = SimilarRecipe.objects.filter(
+            similar__in=recipe_ids[changed].tolist()
+        ).values_list('recipe', flat=True).distinct()
+        stale = np.fromiter(stale, dtype=np.int64)
+        stale = np.searchsorted(recipe_ids, stale[np.isin(stale, recipe_ids)])
+        changed = np.union1d(changed, stale)
+        for row in changed.tolist():
+            merge.pop(row, None)
+    save_similar(recipe_ids, top_similar(vectors, changed, count))
+    if merge:
+        index = {recipe_id: row for row, recipe_id in enumerate(
+            recipe_ids.tolist()
+        )}
+        for recipe, similar, score in SimilarRecipe.objects.filter(
+            recipe__in=[int(recipe_ids[row]) for row in merge]
+        ).values_list('recipe', 'similar', 'score'):
+            if similar in index:
+                merge[index[recipe]].setdefault(index[similar], score)
+        save_similar(recipe_ids, (
+            (row, sorted(
+                scores.items(), key=lambda item: (-item[1], item[0])
+            )[:count])
+            for row, scores in merge.items()
+        ))
+    SimilarityRun.objects.create(
+        started_at=started_at, recipes=len(changed) + len(merge)
+    )
+    return len(changed) + len(merge)
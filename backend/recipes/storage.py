@@ -0,0 +1,55 @@
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+try:
+    from storages.backends.s3boto3 import S3Boto3Storage
+except ImportError:
+    S3Boto3Storage = None
+
+
+class ContentAddressedStorageMixin:
+    """ Имя файла - sha256 его содержимого.
+
+        Файл сохраняется в каталог исходного имени с исходным
+        расширением. Если файл с таким содержимым уже есть,
+        запись пропускается, поэтому одинаковые изображения хранятся
+        один раз, а файл по имени никогда не меняется.
+    """
+
+    def get_content_name(self, name, content):
+        sha256 = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks():
+            sha256.update(chunk)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        dir_name, file_name = os.path.split(name)
+        ext = os.path.splitext(file_name)[1].lower()
+        return os.path.join(dir_name, sha256.hexdigest() + ext)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.get_content_name(name, content)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
+
+
+class ContentAddressedFileSystemStorage(
+    ContentAddressedStorageMixin, FileSystemStorage
+):
+    """ Локальное хранилище с адресацией по содержимому. """
+
+
+if S3Boto3Storage is not None:
+    class ContentAddressedS3Storage(
+        ContentAddressedStorageMixin, S3Boto3Storage
+    ):
+        """ S3-совместимое хранилище с адресацией по содержимому. """
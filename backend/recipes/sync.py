@@ -0,0 +1,116 @@
+from base64 import b64decode, b64encode
+from datetime import datetime, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from foodgram_backend.settings import SYNC_RETENTION_DAYS, SYNC_SAFETY_LAG
+from recipes.models import SyncChange
+from users.models import Subscription
+
+
+class SyncTokenExpired(Exception):
+    """ Журнал изменений для токена уже очищен. """
+
+
+def record_change(kind, user_id, object_id, deleted=False):
+    SyncChange.objects.create(
+        kind=kind, user_id=user_id, object_id=object_id, deleted=deleted,
+    )
+
+
+def encode_token(change_id):
+    """ Непрозрачный токен: id записи журнала и время выдачи. """
+
+    value = f'{change_id}|{timezone.now().isoformat()}'
+    return b64encode(value.encode(), altchars=b'-_').decode()
+
+
+def decode_token(token):
+    """ Id записи журнала из токена.
+
+        ValueError - токен поврежден, SyncTokenExpired - токен старше
+        срока хранения журнала.
+    """
+
+    try:
+        value = b64decode(token.encode(), altchars=b'-_', validate=True)
+        change_id, issued_at = value.decode().split('|')
+        change_id, issued_at = int(change_id), datetime.fromisoformat(
+            issued_at
+        )
+        # Токены выдаются с часовым поясом, id журнала - BigAutoField
+        if issued_at.tzinfo is None:
+            raise ValueError('Время выдачи без часового пояса')
+        if change_id < 0 or change_id.bit_length() > 63:
+            raise ValueError('Id журнала вне диапазона')
+    except (UnicodeError, TypeError, ValueError) as error:
+        raise ValueError(token) from error
+    if issued_at < timezone.now() - timedelta(days=SYNC_RETENTION_DAYS):
+        raise SyncTokenExpired(token)
+    return change_id
+
+
+def last_visible_id():
+    """ Последний id журнала, изменения до которого можно отдавать.
+
+        Граница - запись перед первым изменением моложе
+        SYNC_SAFETY_LAG, а не время, чтобы не пропустить запись с
+        меньшим id, закоммиченную позже.
+    """
+
+    horizon = timezone.now() - timedelta(seconds=SYNC_SAFETY_LAG)
+    first_recent = SyncChange.objects.filter(
+        changed_at__gt=horizon
+    ).order_by('id').values_list('id', flat=True).first()
+    if first_recent is not None:
+        return first_recent - 1
+    return SyncChange.objects.order_by('-id').values_list(
+        'id', flat=True
+    ).first() or 0
+
+
+def current_token():
+    return encode_token(last_visible_id())
+
+
+def get_changes(user, since, limit):
+    """ Страница изменений пользователя после токена since.
+
+        В выборку входят избранное, список покупок и подписки
+        пользователя, его рецепты и рецепты авторов из подписок.
+        Повторные изменения объекта схлопываются в последнее.
+        Возвращает (изменения по типам, токен, есть ли еще).
+    """
+
+    since_id = decode_token(since)
+    last_id = last_visible_id()
+    changes = list(SyncChange.objects.filter(
+        id__gt=since_id, id__lte=last_id
+    ).filter(
+        Q(user=user)
+        | Q(
+            kind=SyncChange.RECIPE,
+            user__in=Subscription.objects.filter(
+                user=user
+            ).values('author'),
+        )
+    ).order_by('id').values_list(
+        'id', 'kind', 'object_id', 'deleted'
+    )[:limit + 1])
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    latest = {}
+    for _, kind, object_id, deleted in changes:
+        latest[kind, object_id] = deleted
+    result = {
+        kind: {'upserted': [], 'deleted': []}
+        for kind, _ in SyncChange.KINDS
+    }
+    for (kind, object_id), deleted in latest.items():
+        result[kind]['deleted' if deleted else 'upserted'].append(object_id)
+    if has_more:
+        token = encode_token(changes[-1][0])
+    else:
+        token = encode_token(max(since_id, last_id))
+    return result, token, has_more
@@ -0,0 +1,100 @@
+import pytest
+from django.contrib import admin
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from recipes.models import (
+    Favorite, RecipeDuplicate, RecipeIngredient, ShoppingCart,
+)
+
+pytestmark = pytest.mark.django_db
+
+MODELS = [
+    model for model in admin.site._registry
+    if model._meta.app_label == 'recipes'
+]
+
+
+@pytest.fixture
+def add_recipes(make_user, make_tag, make_ingredient, make_recipe):
+    """ Рецепты со всеми связями, которые выводят списки админки. """
+
+    recipes = []
+
+    def add_recipes(count):
+        tag = make_tag()
+        for _ in range(count):
+            user = make_user()
+            recipe = make_recipe(
+                author=user, ingredients=(make_ingredient(),), tags=(tag,),
+            )
+            Favorite.objects.create(user=user, recipe=recipe)
+            ShoppingCart.objects.create(user=user, recipe=recipe)
+            if recipes:
+                RecipeDuplicate.objects.create(
+                    recipe=recipe, duplicate=recipes[0], similarity=0.9,
+                )
+            recipes.append(recipe)
+        return recipes
+    return add_recipes
+
+
+def changelist_queries(client, model, **params):
+    url = reverse(
+        f'admin:{model._meta.app_label}_{model._meta.model_name}_changelist'
+    )
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url, params)
+    assert response.status_code == 200
+    return len(queries)
+
+
+@pytest.mark.parametrize(
+    'model', MODELS, ids=[model._meta.model_name for model in MODELS],
+)
+def test_changelist_queries_do_not_grow(admin_client, add_recipes, model):
+    add_recipes(2)
+    queries = changelist_queries(admin_client, model)
+
+    add_recipes(20)
+
+    assert changelist_queries(admin_client, model) == queries
+
+
+def test_recipe_favorites_amount(admin_client, add_recipes, make_user):
+    recipe = add_recipes(3)[1]
+    Favorite.objects.create(user=make_user(), recipe=recipe)
+    response = admin_client.get(
+        reverse('admin:recipes_recipe_changelist'), {'o': '-4'}
+    )
+    changelist = response.context['cl']
+
+    assert [
+        recipe.favorites_count for recipe in changelist.result_list
+    ] == [2, 1, 1]
+    assert changelist.result_list[0] == recipe
+    assert '<td class="field-favorites_amount">2</td>' in (
+        response.content.decode()
+    )
+
+
+def test_recipe_ingredients_read_only(admin_client, add_recipes):
+    """ CartTotal обновляется только при изменении рецепта целиком. """
+
+    add_recipes(1)
+    row = RecipeIngredient.objects.get()
+
+    assert admin_client.get(
+        reverse('admin:recipes_recipeingredient_add')
+    ).status_code == 403
+    assert admin_client.post(
+        reverse('admin:recipes_recipeingredient_change', args=(row.pk,)),
+        {'recipe': row.recipe_id, 'ingredient': row.ingredient_id,
+         'amount': 100},
+    ).status_code == 403
+    assert admin_client.post(
+        reverse('admin:recipes_recipeingredient_delete', args=(row.pk,)),
+        {'post': 'yes'},
+    ).status_code == 403
+    assert RecipeIngredient.objects.get().amount == row.amount
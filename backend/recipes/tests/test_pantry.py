@@ -0,0 +1,110 @@
+import pytest
+from rest_framework.test import APIClient
+
+from recipes import pantry
+from recipes.models import Recipe, Tag
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def index(monkeypatch):
+    index = pantry.PantryIndex()
+    monkeypatch.setattr('api.views.pantry_index', index)
+    return index
+
+
+@pytest.fixture
+def ingredients(make_ingredient):
+    return [make_ingredient() for _ in range(4)]
+
+
+@pytest.fixture
+def recipes(ingredients, make_user, make_tag, make_recipe):
+    """ Рецепт i состоит из первых i + 1 ингредиентов. """
+
+    author = make_user()
+    tag = make_tag()
+    return [
+        make_recipe(
+            author=author, ingredients=ingredients[:i + 1],
+            tags=(tag,) if i % 2 else (),
+        )
+        for i in range(len(ingredients))
+    ]
+
+
+def test_search_order_and_slices(index, ingredients, recipes):
+    results = index.search([ingredients[0].id, ingredients[1].id])
+
+    assert len(results) == 4
+    assert results[:] == [
+        (1.0, 0, recipes[1].id),
+        (1.0, 0, recipes[0].id),
+        (2 / 3, 1, recipes[2].id),
+        (0.5, 2, recipes[3].id),
+    ]
+    assert results[1:3] == results[:][1:3]
+    assert results[3] == results[:][3]
+
+
+def test_search_by_tags(index, ingredients, recipes):
+    tag = Tag.objects.get()
+
+    results = index.search([ingredients[0].id], [tag.id])
+
+    assert [recipe_id for _, _, recipe_id in results[:]] == [
+        recipes[1].id, recipes[3].id,
+    ]
+    assert index.search([ingredients[0].id], [])[:] == []
+
+
+def test_sync_removes_recipes_deleted_elsewhere(
+    index, ingredients, recipes, monkeypatch,
+):
+    assert len(index.search([ingredients[0].id])) == 4
+    monkeypatch.setattr(pantry, 'PANTRY_INDEX_SYNC_INTERVAL', 0)
+
+    # Без коммита сигнал не обновляет индекс, как в другом процессе
+    Recipe.objects.filter(id=recipes[0].id).delete()
+
+    results = index.search([ingredients[0].id])
+    assert recipes[0].id not in [recipe_id for _, _, recipe_id in results[:]]
+    assert len(results) == 3
+
+
+def test_pantry_view_pages(index, ingredients, recipes):
+    response = APIClient().get(
+        '/api/recipes/pantry/',
+        {'ingredients': f'{ingredients[0].id},{ingredients[1].id}',
+         'limit': 2, 'page': 2},
+    )
+
+    assert response.status_code == 200, response.content
+    data = response.json()
+    assert data['count'] == 4
+    assert [
+        (recipe['id'], recipe['missing']) for recipe in data['results']
+    ] == [(recipes[2].id, 1), (recipes[3].id, 2)]
+
+
+def test_pantry_view_skips_empty_values(index, ingredients, recipes):
+    response = APIClient().get(
+        '/api/recipes/pantry/',
+        {'ingredients': f'{ingredients[0].id},,{ingredients[1].id},',
+         'omit': 'id'},
+    )
+
+    assert response.status_code == 200, response.content
+    data = response.json()
+    assert data['count'] == 4
+    assert {recipe['id'] for recipe in data['results']} == {
+        recipe.id for recipe in recipes
+    }
+
+
+@pytest.mark.parametrize('value', ('', ',', 'a', '1,²'))
+def test_pantry_view_bad_ingredients(index, value):
+    response = APIClient().get('/api/recipes/pantry/', {'ingredients': value})
+
+    assert response.status_code == 400
@@ -0,0 +1,53 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from recipes.popularity import refresh_hourly_stats, refresh_popularity
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def users(make_user):
+    return [make_user() for _ in range(3)]
+
+
+@pytest.fixture
+def recipes(users, make_recipe):
+    return [make_recipe(author=users[0]) for _ in range(3)]
+
+
+def popular_ids():
+    response = APIClient().get('/api/recipes/', {'ordering': 'popular'})
+    assert response.status_code == 200, response.content
+    return [recipe['id'] for recipe in response.json()['results']]
+
+
+def test_ordering_popular(users, recipes):
+    first, second, third = recipes
+    for user in users:
+        Favorite.objects.create(user=user, recipe=second)
+    ShoppingCart.objects.create(user=users[0], recipe=first)
+    # Добавление старше окна не влияет на рейтинг
+    old = Favorite.objects.create(user=users[1], recipe=first)
+    Favorite.objects.filter(pk=old.pk).update(
+        added_at=timezone.now() - timedelta(days=30)
+    )
+    refresh_hourly_stats()
+
+    assert refresh_popularity() == 2
+    assert refresh_popularity() == 0
+    assert dict(Recipe.objects.values_list('pk', 'popularity')) == {
+        first.pk: 1, second.pk: 3, third.pk: 0,
+    }
+    assert popular_ids() == [second.id, first.id, third.id]
+
+
+def test_refresh_popularity_resets_left_window(recipes):
+    Recipe.objects.filter(pk=recipes[0].pk).update(popularity=5)
+
+    assert refresh_popularity() == 1
+    assert not Recipe.objects.filter(popularity__gt=0).exists()
@@ -0,0 +1,117 @@
+import pytest
+from django.core.files.base import ContentFile
+
+from foodgram_backend.settings import RECIPE_IMAGE_RENDITION_WIDTHS
+from recipes import renditions
+from recipes.models import Recipe
+from recipes.renditions import make_renditions
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def scheduled(monkeypatch):
+    scheduled = []
+    monkeypatch.setattr(
+        'recipes.signals.schedule_renditions',
+        lambda recipe: scheduled.append(recipe.pk),
+    )
+    return scheduled
+
+
+@pytest.fixture
+def recipe(settings, tmp_path, scheduled, make_user, png_image):
+    settings.MEDIA_ROOT = tmp_path
+    recipe = Recipe(
+        name='Рецепт', text='Описание', cooking_time=10, author=make_user(),
+    )
+    recipe.image.save('red.png', ContentFile(png_image))
+    return recipe
+
+
+def test_stale_save_keeps_background_fields(recipe):
+    stale = Recipe.objects.get(pk=recipe.pk)
+    make_renditions(recipe.pk)
+    Recipe.objects.filter(pk=recipe.pk).update(popularity=3)
+
+    stale.name = 'Новое название'
+    stale.save()
+
+    recipe.refresh_from_db()
+    assert recipe.name == 'Новое название'
+    assert recipe.image_renditions['source'] == recipe.image.name
+    assert recipe.image_placeholder
+    assert recipe.popularity == 3
+
+
+def test_renditions_queued_only_for_new_image(recipe, scheduled):
+    assert scheduled == [recipe.pk]
+
+    recipe.save()
+    loaded = Recipe.objects.get(pk=recipe.pk)
+    loaded.save()
+    Recipe.objects.only('name').get(pk=recipe.pk).save()
+
+    assert scheduled == [recipe.pk]
+
+    loaded.image = 'recipes/other.png'
+    loaded.save()
+    loaded.save()
+
+    assert scheduled == [recipe.pk, recipe.pk]
+
+
+@pytest.fixture
+def encoded(monkeypatch):
+    encoded = []
+    save_rendition = renditions.save_rendition
+
+    def save(storage, image, name, image_format):
+        encoded.append(image_format)
+        return save_rendition(storage, image, name, image_format)
+    monkeypatch.setattr(renditions, 'save_rendition', save)
+    return encoded
+
+
+def test_renditions_reused_for_same_image(recipe, encoded, make_user):
+    make_renditions(recipe.pk)
+    assert len(encoded) == 2 * len(RECIPE_IMAGE_RENDITION_WIDTHS)
+    recipe.refresh_from_db()
+    same = Recipe.objects.create(
+        name='Копия', text='Описание', cooking_time=10, author=make_user(),
+        image=recipe.image.name,
+    )
+    encoded.clear()
+
+    make_renditions(recipe.pk)
+    make_renditions(same.pk)
+
+    assert encoded == []
+    same.refresh_from_db()
+    assert same.image_renditions == recipe.image_renditions
+    assert same.image_placeholder == recipe.image_placeholder
+
+
+def test_missing_rendition_encoded_again(recipe, encoded):
+    make_renditions(recipe.pk)
+    recipe.refresh_from_db()
+    width = str(RECIPE_IMAGE_RENDITION_WIDTHS[0])
+    deleted = recipe.image_renditions['sizes'][width]['webp']
+    recipe.image.storage.delete(deleted)
+    encoded.clear()
+
+    make_renditions(recipe.pk)
+
+    # Одинаковые копии разных ширин хранятся одним файлом
+    assert encoded == ['WEBP'] * [
+        names['webp'] for names in recipe.image_renditions['sizes'].values()
+    ].count(deleted)
+    recipe.refresh_from_db()
+    assert recipe.image.storage.exists(
+        recipe.image_renditions['sizes'][width]['webp']
+    )
+
+    encoded.clear()
+    make_renditions(recipe.pk, force=True)
+
+    assert len(encoded) == 2 * len(RECIPE_IMAGE_RENDITION_WIDTHS)
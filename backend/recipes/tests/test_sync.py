@@ -0,0 +1,28 @@
+from base64 import b64encode
+from datetime import datetime
+
+import pytest
+from django.utils import timezone
+
+from recipes.sync import decode_token, encode_token
+
+
+def token(value):
+    return b64encode(value.encode(), altchars=b'-_').decode()
+
+
+def test_decode_token():
+    assert decode_token(encode_token(42)) == 42
+
+
+@pytest.mark.parametrize('value', (
+    f'1|{datetime.now().isoformat()}',
+    f'-1|{timezone.now().isoformat()}',
+    f'{2 ** 63}|{timezone.now().isoformat()}',
+    f'²|{timezone.now().isoformat()}',
+    '1|вчера',
+    '1',
+))
+def test_decode_bad_token(value):
+    with pytest.raises(ValueError):
+        decode_token(token(value))
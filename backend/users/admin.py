@@ -1,6 +1,9 @@
 from django.contrib import admin
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 
 from foodgram_backend.settings import EMPTY_VALUE
+from recipes.models import Recipe
 
 from .models import Subscription, User
 
@@ -8,26 +11,53 @@ from .models import Subscription, User
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
     list_display = (
-        'pk', 'email', 'username', 'first_name', 'last_name'
+        'pk', 'email', 'username', 'first_name', 'last_name',
+        'recipes_amount',
     )
     search_fields = (
         'username', 'email', 'first_name', 'last_name'
     )
     list_filter = (
-        'username', 'email'
+        'is_staff', 'is_active',
     )
+    show_full_result_count = False
     empty_value_display = EMPTY_VALUE
 
+    def get_queryset(self, request):
+        """ Число рецептов подзапросом для каждой строки страницы. """
+
+        return super().get_queryset(request).annotate(
+            recipes_count=Coalesce(
+                Subquery(
+                    Recipe.objects.filter(
+                        author=OuterRef('pk')
+                    ).order_by().values('author').annotate(
+                        count=Count('pk')
+                    ).values('count'),
+                    output_field=IntegerField(),
+                ),
+                0,
+            )
+        )
+
+    @admin.display(description='Рецептов', ordering='recipes_count')
+    def recipes_amount(self, obj):
+        return obj.recipes_count
+
 
 @admin.register(Subscription)
 class SubscriptionAdmin(admin.ModelAdmin):
     list_display = (
         'pk', 'user', 'author'
     )
-    search_fields = (
-        'user', 'author'
+    list_select_related = (
+        'user', 'author',
     )
-    list_filter = (
-        'user', 'author'
+    autocomplete_fields = (
+        'user', 'author',
+    )
+    search_fields = (
+        'user__username', 'author__username',
     )
+    show_full_result_count = False
     empty_value_display = EMPTY_VALUE
@@ -0,0 +1,43 @@
+from django.db import migrations
+
+PREFIX_SEARCH_FIELDS = ('username', 'first_name', 'last_name')
+
+
+def create_prefix_indexes(apps, schema_editor):
+    """ Индексы для istartswith на PostgreSQL.
+
+        Django строит для istartswith условие
+        UPPER(field::text) LIKE UPPER(...), которое использует только
+        индекс по тому же выражению с text_pattern_ops. На других БД
+        индексы не создаются.
+    """
+
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    table = apps.get_model('users', 'User')._meta.db_table
+    for field in PREFIX_SEARCH_FIELDS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {table}_{field}_upper_like '
+            f'ON {table} (UPPER({field}::text) text_pattern_ops)'
+        )
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    table = apps.get_model('users', 'User')._meta.db_table
+    for field in PREFIX_SEARCH_FIELDS:
+        schema_editor.execute(
+            f'DROP INDEX IF EXISTS {table}_{field}_upper_like'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+    ]
@@ -0,0 +1,70 @@
+import pytest
+from django.contrib import admin
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from users.models import Subscription
+
+pytestmark = pytest.mark.django_db
+
+MODELS = [
+    model for model in admin.site._registry
+    if model._meta.app_label == 'users'
+]
+
+
+@pytest.fixture
+def add_users(make_user, make_recipe):
+    """ Авторы с i % 3 рецептами и подпиской на предыдущего автора. """
+
+    users = []
+
+    def add_users(count):
+        for _ in range(count):
+            user = make_user()
+            for _ in range(len(users) % 3):
+                make_recipe(author=user)
+            if users:
+                Subscription.objects.create(user=user, author=users[-1])
+            users.append(user)
+        return users
+    return add_users
+
+
+def changelist_queries(client, model):
+    url = reverse(
+        f'admin:{model._meta.app_label}_{model._meta.model_name}_changelist'
+    )
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(queries)
+
+
+@pytest.mark.parametrize(
+    'model', MODELS, ids=[model._meta.model_name for model in MODELS],
+)
+def test_changelist_queries_do_not_grow(admin_client, add_users, model):
+    add_users(2)
+    queries = changelist_queries(admin_client, model)
+
+    add_users(20)
+
+    assert changelist_queries(admin_client, model) == queries
+
+
+def test_user_recipes_amount(admin_client, add_users):
+    users = add_users(3)
+    response = admin_client.get(
+        reverse('admin:users_user_changelist'), {'o': '-6'}
+    )
+    changelist = response.context['cl']
+
+    assert [
+        user.recipes_count for user in changelist.result_list
+    ] == [2, 1, 0, 0]
+    assert changelist.result_list[:2] == [users[2], users[1]]
+    assert '<td class="field-recipes_amount">2</td>' in (
+        response.content.decode()
+    )